@@ -0,0 +1,50 @@
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import replace
+
+from core import make_7x7_rules, initial_state, legal_actions, apply, is_terminal
+from compact import CompactRules, to_compact, pack_action, c_legal_actions, c_apply, c_is_terminal
+
+def footprint(make, n: int) -> float:
+    tracemalloc.start()
+    keep = [make() for _ in range(n)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del keep
+    return size / n
+
+def playouts(games: int, legal, step, terminal, start, rules) -> float:
+    rng = random.Random(0)
+    ops = 0
+    t0 = time.perf_counter()
+    for _ in range(games):
+        s = start()
+        while not terminal(s, rules)[0]:
+            acts = legal(s, rules)
+            if not acts:
+                break
+            step(s, rules, acts[rng.randrange(len(acts))])
+            ops += 1
+    return ops / (time.perf_counter() - t0)
+
+def main(games: int = 200, n: int = 20000):
+    rules = make_7x7_rules()
+    cr = CompactRules(rules)
+    gs = initial_state(rules)
+    gs.seen_counts.clear()
+    rng = random.Random(1)
+    moves = [('move', rng.randrange(49), rng.randrange(49)) for _ in range(n)]
+    it = iter(moves*2)
+    print(f"state, list board + dataclass:   {footprint(lambda: replace(gs, board=gs.board[:], seen_counts={}), n):7.0f} B")
+    print(f"state, bytearray + __slots__:    {footprint(lambda: to_compact(gs, history=False), n):7.0f} B")
+    print(f"move action, tuple:              {footprint(lambda: ('move',) + next(it)[1:], n):7.0f} B")
+    print(f"move action, packed int:         {footprint(lambda: pack_action(next(it)), n):7.0f} B")
+    base = playouts(games, legal_actions, apply, is_terminal, lambda: initial_state(rules), rules)
+    fast = playouts(games, c_legal_actions, c_apply, c_is_terminal, lambda: to_compact(initial_state(rules)), cr)
+    print(f"playout plies/s, GameState:      {base:9,.0f}")
+    print(f"playout plies/s, CompactState:   {fast:9,.0f}   ({fast/base:.2f}x)")
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
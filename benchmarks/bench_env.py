@@ -0,0 +1,18 @@
+import sys
+import time
+
+from env import BatchBaghChalEnv
+
+def main(batch: int = 256, steps: int = 500):
+    env = BatchBaghChalEnv(batch, seed=0)
+    env.reset()
+    games = 0
+    t0 = time.perf_counter()
+    for _ in range(steps):
+        _, _, done, _ = env.step(env.sample_legal(), check=False)
+        games += int(done.sum())
+    dt = time.perf_counter() - t0
+    print(f"batch {batch}: {batch*steps/dt:,.0f} env steps/s, {games} games finished in {dt:.2f}s")
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
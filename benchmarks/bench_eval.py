@@ -0,0 +1,31 @@
+import asyncio
+import random
+import sys
+
+from core import make_7x7_rules, initial_state, legal_actions, apply, is_terminal
+from evaluator import FeatureEncoder, MLPModel, EvalService
+
+async def walker(service: EvalService, rules, evals: int, seed: int):
+    # Stands in for one search: evaluates a position, then plays a random move.
+    rng = random.Random(seed)
+    gs = initial_state(rules)
+    for _ in range(evals):
+        if is_terminal(gs, rules)[0]:
+            gs = initial_state(rules)
+        await service.evaluate(gs)
+        acts = legal_actions(gs, rules)
+        apply(gs, rules, acts[rng.randrange(len(acts))])
+
+async def run(max_batch: int, clients: int, evals: int, max_delay: float) -> str:
+    rules = make_7x7_rules()
+    enc = FeatureEncoder(rules)
+    async with EvalService(MLPModel(enc), enc, max_batch=max_batch, max_delay=max_delay) as service:
+        await asyncio.gather(*(walker(service, rules, evals, s) for s in range(clients)))
+        return service.stats.summary()
+
+def main(clients: int = 64, evals: int = 200):
+    for max_batch in (1, 8, 32, 64):
+        print(f"max_batch {max_batch:3d}: {asyncio.run(run(max_batch, clients, evals, 0.002))}")
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
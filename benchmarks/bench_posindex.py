@@ -0,0 +1,48 @@
+import os
+import random
+import sys
+import tempfile
+import time
+
+from core import make_7x7_rules, initial_state, legal_actions, apply, terminal_status, tiger_greedy, goat_greedy
+from records import RecordWriter
+from posindex import build_index, PositionIndex
+
+def write_games(path: str, rules, games: int, seed: int = 0):
+    # Greedy play with random deviations, so openings repeat but games diverge.
+    rng = random.Random(seed)
+    with RecordWriter(path, rules, chunk_games=256) as w:
+        for _ in range(games):
+            gs, acts = initial_state(rules), []
+            while terminal_status(gs, rules)[0] is None and len(acts) < 300:
+                if rng.random() < 0.3:
+                    a = rng.choice(legal_actions(gs, rules))
+                else:
+                    a = tiger_greedy(gs, rules) if gs.player == 'tiger' else goat_greedy(gs, rules)
+                acts.append(a)
+                apply(gs, rules, a)
+            w.write(acts, *terminal_status(gs, rules))
+
+def main(games: int = 2000, workers: int = os.cpu_count() or 1):
+    rules = make_7x7_rules()
+    with tempfile.TemporaryDirectory() as tmp:
+        rec = os.path.join(tmp, 'games.rec')
+        write_games(rec, rules, games)
+        for w, run_entries in ((1, 1 << 20), (1, 20000), (workers, 1 << 20)):
+            out = os.path.join(tmp, 'games.pidx')
+            t0 = time.perf_counter()
+            info = build_index([rec], out, workers=w, run_entries=run_entries)
+            dt = time.perf_counter() - t0
+            print(f"workers {w}  run_entries {run_entries:8d}: {info['plies']/dt:9,.0f} plies/s  "
+                  f"{info['runs']:3d} runs  {info['rows']} rows")
+        idx = PositionIndex(out, rules)
+        keys = idx.keys[::max(1, len(idx) // 20000)].tolist()
+        t0 = time.perf_counter()
+        for k in keys:
+            idx.lookup_key(k)
+        print(f"lookup: {1e6*(time.perf_counter() - t0)/len(keys):.1f} us  ({len(idx)} rows, "
+              f"{os.path.getsize(out)/len(idx):.0f} bytes/row)")
+        idx.close()
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,49 @@
+import os
+import sys
+import tempfile
+import time
+
+from core import make_7x7_rules
+from env import BatchBaghChalEnv
+from records import RecordWriter, read_records
+
+WINNER = {1: 'goat', 2: 'tiger', 3: 'draw'}
+
+def random_games(rules, n: int, batch: int = 256):
+    # n distinct uniformly random games, played in lockstep by the batch env.
+    env = BatchBaghChalEnv(batch, rules, seed=0)
+    env.reset()
+    moves = [[] for _ in range(batch)]
+    games = []
+    while len(games) < n:
+        acts = env.sample_legal()
+        _, _, done, info = env.step(acts)
+        for r, a in enumerate(acts.tolist()):
+            moves[r].append(a)
+            if done[r]:
+                games.append((moves[r], WINNER[int(info['winner'][r])]))
+                moves[r] = []
+    return games[:n]
+
+def main(games: int = 10000):
+    rules = make_7x7_rules()
+    pool = random_games(rules, games)
+    plies = sum(len(m) for m, _ in pool)
+    print(f"{games} distinct games, {plies} plies")
+    with tempfile.TemporaryDirectory() as d:
+        for compress in (False, True):
+            path = os.path.join(d, f"bench{int(compress)}.rec")
+            t0 = time.perf_counter()
+            with RecordWriter(path, rules, compress=compress) as w:
+                for moves, winner in pool:
+                    w.write(moves, winner)
+            wt = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            n = sum(len(r.actions) for r in read_records(path))
+            rt = time.perf_counter() - t0
+            assert n == plies
+            print(f"{'zlib' if compress else 'raw ':}: {os.path.getsize(path)/plies:.2f} B/ply   "
+                  f"write {plies/wt:12,.0f} plies/s   read {plies/rt:12,.0f} plies/s")
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,50 @@
+import random
+import sys
+import time
+import tkinter as tk
+
+from core import make_rules, initial_state, legal_actions, apply, is_terminal
+from game import BaghChal7x7GUI
+
+def replay(app, N: int, plies: int, full: bool) -> float:
+    # Redraws per second while replaying a random game; full=True rebuilds
+    # every canvas item each ply the way the old renderer did.
+    rng = random.Random(N)
+    app.rules = make_rules(N, goats_to_place=min(N*N - 8, 30 + 2*(N - 7)))
+    app.state = initial_state(app.rules)
+    app.selected, app.legal_dest = None, []
+    app.compute_points()
+    app.build_board()
+    app.root.update_idletasks()
+    done = 0
+    t0 = time.perf_counter()
+    while done < plies:
+        if is_terminal(app.state, app.rules)[0]:
+            app.state = initial_state(app.rules)
+        acts = legal_actions(app.state, app.rules)
+        apply(app.state, app.rules, acts[rng.randrange(len(acts))])
+        if full:
+            app.build_board()
+        else:
+            app.draw_board()
+        app.root.update_idletasks()
+        done += 1
+    return done / (time.perf_counter() - t0)
+
+def main(plies: int = 300):
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"bench_render needs a display: {e}", file=sys.stderr)
+        return
+    root.withdraw()
+    app = BaghChal7x7GUI(root)
+    app.ai_role = None  # keep the AI out of the replay
+    for N in (7, 9, 11):
+        full = replay(app, N, plies, True)
+        inc = replay(app, N, plies, False)
+        print(f"{N}x{N}: full redraw {full:8,.0f}/s   incremental {inc:8,.0f}/s   ({inc/full:.1f}x)")
+    root.destroy()
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,62 @@
+import asyncio
+import json
+import random
+import sys
+import time
+
+from core import make_7x7_rules, initial_state, legal_actions, apply, is_terminal, action_to_index
+from server import AnalysisServer, ResultCache
+
+def sample_games(rules, games: int, plies: int, seed: int = 0):
+    # Action prefixes of random games; clients re-ask positions from this pool.
+    rng = random.Random(seed)
+    out = []
+    for _ in range(games):
+        gs, acts = initial_state(rules), []
+        for _ in range(plies):
+            if is_terminal(gs, rules)[0]:
+                break
+            a = rng.choice(legal_actions(gs, rules))
+            acts.append(action_to_index(a, rules.N))
+            apply(gs, rules, a)
+            out.append(list(acts))
+    return out
+
+async def client(port: int, prefixes, requests: int, seed: int, engine: str):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    for _ in range(requests):
+        body = json.dumps({'actions': rng.choice(prefixes), 'engine': engine, 'depth': 2}).encode()
+        writer.write(b'POST /analyze HTTP/1.1\r\nContent-Length: %d\r\n\r\n' % len(body) + body)
+        await writer.drain()
+        n = 0
+        while True:
+            line = await reader.readline()
+            if line == b'\r\n':
+                break
+            if line.lower().startswith(b'content-length:'):
+                n = int(line.split(b':')[1])
+        json.loads(await reader.readexactly(n))
+    writer.close()
+
+async def run(engine: str, clients: int, requests: int, workers: int, cache_entries: int) -> str:
+    rules = make_7x7_rules()
+    prefixes = sample_games(rules, 20, 20)
+    server = AnalysisServer(workers, ResultCache(cache_entries))
+    await server.start(port=0)
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client(server.port, prefixes, requests, s, engine) for s in range(clients)))
+    dt = time.perf_counter() - t0
+    st = server.stats.to_dict(server.cache, 0)
+    await server.close()
+    return (f"{st['requests']/dt:8,.0f} req/s  hits {100*st['hit_rate']:3.0f}%  merged {st['merged']:4d}  "
+            f"analyses {st['analyses']:4d}  p50 {st['p50_ms']:.2f} ms  p99 {st['p99_ms']:.2f} ms")
+
+def main(clients: int = 32, requests: int = 50, workers: int = 2):
+    for engine in ('greedy', 'search'):
+        for cache_entries in (1, 100_000):
+            label = 'no cache' if cache_entries == 1 else 'cache'
+            print(f"{engine:6s} {label:8s}: {asyncio.run(run(engine, clients, requests, workers, cache_entries))}")
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,42 @@
+import sys
+import time
+
+from core import GameState, make_7x7_rules, initial_state, legal_actions, apply, apply_undo, undo
+
+def copy_state(gs: GameState) -> GameState:
+    return GameState(board=gs.board[:], goats_placed=gs.goats_placed, goats_captured=gs.goats_captured,
+                     player=gs.player, move_count=gs.move_count, chain_active=gs.chain_active,
+                     chain_src=gs.chain_src, seen_counts=dict(gs.seen_counts), zkey=gs.zkey,
+                     tiger_mobility=gs.tiger_mobility)
+
+def explore_copy(gs: GameState, rules, depth: int) -> int:
+    if depth == 0:
+        return 1
+    n = 0
+    for a in legal_actions(gs, rules):
+        child = copy_state(gs)
+        apply(child, rules, a)
+        n += explore_copy(child, rules, depth-1)
+    return n
+
+def explore_undo(gs: GameState, rules, depth: int) -> int:
+    if depth == 0:
+        return 1
+    n = 0
+    for a in legal_actions(gs, rules):
+        rec = apply_undo(gs, rules, a)
+        n += explore_undo(gs, rules, depth-1)
+        undo(gs, rules, rec)
+    return n
+
+def main(depth: int = 4):
+    rules = make_7x7_rules()
+    for name, fn in (('copy', explore_copy), ('undo', explore_undo)):
+        gs = initial_state(rules)
+        t0 = time.perf_counter()
+        leaves = fn(gs, rules, depth)
+        dt = time.perf_counter() - t0
+        print(f"{name}: depth {depth}  leaves {leaves}  {dt:.2f}s  {leaves/dt:,.0f} leaves/s")
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
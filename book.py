@@ -0,0 +1,171 @@
+import argparse
+import mmap
+import os
+import multiprocessing as mp
+import random
+import struct
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from core import (Rules, GameState, make_rules, initial_state, legal_actions, apply, terminal_status,
+                  position_key_with_counts, action_to_index, index_to_action, tiger_greedy, goat_greedy)
+from search import AlphaBeta
+from symmetry import canonical_key, transform_state, from_canonical
+
+# File layout: header, then records sorted by key. Keys are symmetry-canonical
+# and actions are stored in the canonical frame, so one entry serves all
+# rotations/reflections of a position.
+MAGIC = b'BCBK'
+VERSION = 1
+_HEADER = struct.Struct('<4sHBBBBBBI')   # magic, version, N, goats, captures, multijump, ko, sanctuaries, count
+_RECORD = struct.Struct('<QHi')          # key, action index, score
+
+def book_key(gs: GameState, rules: Rules) -> Tuple[int, int]:
+    key, sym = canonical_key(gs, rules)
+    return position_key_with_counts(gs, rules, key), sym
+
+def collect_positions(rules: Rules, plies: int, games: int, seed: int = 0, epsilon: float = 0.3
+                      ) -> Dict[int, List]:
+    # Greedy self-play with random deviations; returns key -> [visits, canonical state].
+    rng = random.Random(seed)
+    seen: Dict[int, List] = {}
+    for _ in range(games):
+        gs = initial_state(rules)
+        while gs.move_count < plies and terminal_status(gs, rules)[0] is None:
+            key, sym = book_key(gs, rules)
+            entry = seen.get(key)
+            if entry is None:
+                seen[key] = [1, transform_state(gs, rules, sym)]
+            else:
+                entry[0] += 1
+            if rng.random() < epsilon:
+                acts = legal_actions(gs, rules)
+                act = rng.choice(acts) if acts else None
+            else:
+                act = tiger_greedy(gs, rules) if gs.player == 'tiger' else goat_greedy(gs, rules)
+            if act is None or not apply(gs, rules, act):
+                break
+    return seen
+
+_engine: Optional[AlphaBeta] = None
+
+def _solve(job):
+    global _engine
+    key, gs, rules, depth = job
+    if _engine is None or _engine.rules is not rules:
+        _engine = AlphaBeta(rules, tt_size=1 << 16)
+    act = _engine.choose(gs, time_limit=float('inf'), max_depth=depth)
+    if act is None:
+        return None
+    return key, action_to_index(act, rules.N), _engine.stats.score
+
+def build_book(rules: Rules, path: str, plies: int = 12, games: int = 2000, depth: int = 2, min_visits: int = 2,
+               workers: int = 1, seed: int = 0, epsilon: float = 0.3) -> int:
+    seen = collect_positions(rules, plies, games, seed, epsilon)
+    jobs = [(k, gs, rules, depth) for k, (n, gs) in seen.items() if n >= min_visits]
+    if workers > 1:
+        with mp.Pool(workers) as pool:
+            solved = pool.map(_solve, jobs, chunksize=16)
+    else:
+        solved = [_solve(j) for j in jobs]
+    return write_book(path, rules, [r for r in solved if r is not None])
+
+def write_book(path: str, rules: Rules, records) -> int:
+    records = sorted(records)
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, *rules.options(), len(records)))
+        for key, action, score in records:
+            f.write(_RECORD.pack(key, action, max(-2**31, min(2**31 - 1, score))))
+    return len(records)
+
+class OpeningBook:
+    # Read-only view over a book file. The mapping is shared through the page
+    # cache, so any number of processes can open the same book cheaply.
+    def __init__(self, path: str, rules: Rules):
+        self._file = open(path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            self._file.close()
+            raise ValueError(f"{path} is not an opening book")
+        if len(self._mm) < _HEADER.size:
+            self.close()
+            raise ValueError(f"{path} is not an opening book")
+        magic, version, *options, count = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not an opening book")
+        if len(self._mm) != _HEADER.size + count*_RECORD.size:
+            self.close()
+            raise ValueError(f"{path} is truncated: {count} records need {_HEADER.size + count*_RECORD.size} bytes")
+        if tuple(options) != tuple(int(x) for x in rules.options()):
+            self.close()
+            raise ValueError(f"{path} was built for different rules {tuple(options)}")
+        self.rules = rules
+        self.count = count
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _find(self, key: int) -> Optional[Tuple[int, int]]:
+        mm = self._mm
+        lo, hi = 0, self.count
+        base, size = _HEADER.size, _RECORD.size
+        unpack = _RECORD.unpack_from
+        while lo < hi:
+            mid = (lo + hi) >> 1
+            k, action, score = unpack(mm, base + mid*size)
+            if k < key:
+                lo = mid + 1
+            elif k > key:
+                hi = mid
+            else:
+                return action, score
+        return None
+
+    def lookup(self, gs: GameState):
+        # Book move for gs in its own frame, or None when the position is not covered.
+        key, sym = book_key(gs, self.rules)
+        found = self._find(key)
+        if found is not None:
+            act = from_canonical(index_to_action(found[0], self.rules.N), self.rules, sym)
+            if act in legal_actions(gs, self.rules):
+                self.hits += 1
+                return act
+        self.misses += 1
+        return None
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Build a placement-phase opening book for 7x7 Bagh-Chal.")
+    ap.add_argument('--out', default='opening.book')
+    ap.add_argument('--plies', type=int, default=12, help="cover positions reached in the first PLIES plies")
+    ap.add_argument('--games', type=int, default=2000, help="self-play games used to collect positions")
+    ap.add_argument('--min-visits', type=int, default=2, help="skip positions seen fewer times")
+    ap.add_argument('--depth', type=int, default=2, help="alpha-beta depth for each book reply")
+    ap.add_argument('--epsilon', type=float, default=0.3)
+    ap.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    ap.add_argument('--seed', type=int, default=0)
+    ap.add_argument('--goats-to-place', type=int, default=30)
+    ap.add_argument('--capture-to-win', type=int, default=8)
+    ap.add_argument('--no-multijump', action='store_true')
+    ap.add_argument('--no-ko', action='store_true')
+    args = ap.parse_args(argv)
+
+    rules = make_rules(7, goats_to_place=args.goats_to_place, capture_to_win=args.capture_to_win,
+                       enable_multijump=not args.no_multijump, enable_ko=not args.no_ko)
+    t0 = time.perf_counter()
+    n = build_book(rules, args.out, args.plies, args.games, args.depth, args.min_visits, max(1, args.workers),
+                   args.seed, args.epsilon)
+    print(f"wrote {n} positions to {args.out} in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
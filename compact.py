@@ -0,0 +1,171 @@
+from typing import Dict, List, Optional
+
+from core import EMPTY, GOAT, TIGER, MAX_PLIES, Rules, GameState
+
+# Actions packed as kind<<14 | src<<7 | dst, so a placement is just its square.
+PLACE, MOVE, JUMP = 0, 1, 2
+KINDS = ('place', 'move', 'jump')
+GOAT_SIDE, TIGER_SIDE = 0, 1
+SIDES = ('goat', 'tiger')
+
+def pack_action(action) -> int:
+    if action[0] == 'place':
+        return action[1]
+    return (KINDS.index(action[0]) << 14) | (action[1] << 7) | action[2]
+
+def unpack_action(code: int):
+    kind = code >> 14
+    if kind == PLACE:
+        return ('place', code & 127)
+    return (KINDS[kind], (code >> 7) & 127, code & 127)
+
+class CompactRules:
+    __slots__ = ('rules', 'NN', 'adj', 'moves', 'jumps', 'jump_over', 'safe', 'Zp')
+
+    def __init__(self, rules: Rules):
+        NN = rules.N*rules.N
+        if NN > 128:
+            raise ValueError("compact actions support boards up to 11x11")
+        self.rules = rules
+        self.NN = NN
+        self.adj = [frozenset(a) for a in rules.ADJ]
+        self.moves = [tuple((d, (MOVE << 14) | (i << 7) | d) for d in rules.ADJ[i]) for i in range(NN)]
+        self.jumps = [tuple((o, l, (JUMP << 14) | (i << 7) | l) for o, l in rules.JUMPS[i] if o not in rules.safe_nodes)
+                      for i in range(NN)]
+        self.jump_over = [{l: o for o, l in rules.JUMPS[i]} for i in range(NN)]
+        self.safe = frozenset(rules.safe_nodes)
+        self.Zp = rules.Z.piece
+
+class CompactState:
+    __slots__ = ('board', 'side', 'goats_placed', 'goats_captured', 'move_count', 'chain_src', 'zkey', 'seen_counts')
+
+    def __init__(self, board: bytearray, side: int, goats_placed: int, goats_captured: int, move_count: int,
+                 chain_src: int = -1, zkey: int = 0, seen_counts: Optional[Dict[int, int]] = None):
+        self.board = board
+        self.side = side
+        self.goats_placed = goats_placed
+        self.goats_captured = goats_captured
+        self.move_count = move_count
+        self.chain_src = chain_src
+        self.zkey = zkey
+        self.seen_counts = seen_counts if seen_counts is not None else {}
+
+    def copy(self, history: bool = True) -> 'CompactState':
+        return CompactState(bytearray(self.board), self.side, self.goats_placed, self.goats_captured,
+                            self.move_count, self.chain_src, self.zkey,
+                            dict(self.seen_counts) if history else {})
+
+def to_compact(gs: GameState, history: bool = True) -> CompactState:
+    return CompactState(bytearray(gs.board), SIDES.index(gs.player), gs.goats_placed, gs.goats_captured,
+                        gs.move_count, gs.chain_src if gs.chain_active and gs.chain_src is not None else -1,
+                        gs.zkey, dict(gs.seen_counts) if history else {})
+
+def from_compact(cs: CompactState) -> GameState:
+    chain = cs.chain_src >= 0
+    return GameState(board=list(cs.board), goats_placed=cs.goats_placed, goats_captured=cs.goats_captured,
+                     player=SIDES[cs.side], move_count=cs.move_count, chain_active=chain,
+                     chain_src=cs.chain_src if chain else None, seen_counts=dict(cs.seen_counts), zkey=cs.zkey)
+
+def c_legal_actions(cs: CompactState, cr: CompactRules) -> List[int]:
+    b = cs.board
+    if cs.side == GOAT_SIDE:
+        if cs.chain_src >= 0:
+            return []
+        if cs.goats_placed < cr.rules.goats_to_place:
+            return [i for i in range(cr.NN) if b[i]==EMPTY]
+        acts = []
+        moves = cr.moves
+        i = b.find(GOAT)
+        while i >= 0:
+            for d, code in moves[i]:
+                if b[d]==EMPTY:
+                    acts.append(code)
+            i = b.find(GOAT, i+1)
+        return acts
+    jumps = cr.jumps
+    if cs.chain_src >= 0 and cr.rules.enable_multijump:
+        return [code for o, l, code in jumps[cs.chain_src] if b[o]==GOAT and b[l]==EMPTY]
+    acts = []
+    moves = cr.moves
+    i = b.find(TIGER)
+    while i >= 0:
+        for d, code in moves[i]:
+            if b[d]==EMPTY:
+                acts.append(code)
+        for o, l, code in jumps[i]:
+            if b[o]==GOAT and b[l]==EMPTY:
+                acts.append(code)
+        i = b.find(TIGER, i+1)
+    return acts
+
+def c_is_terminal(cs: CompactState, cr: CompactRules):
+    rules = cr.rules
+    if rules.enable_ko and cs.seen_counts.get(cs.zkey, 0) >= 3:
+        return True, 'draw'
+    if cs.goats_captured >= rules.capture_to_win:
+        return True, 'tiger'
+    if cs.side == TIGER_SIDE and not c_legal_actions(cs, cr):
+        return True, 'goat'
+    if cs.move_count >= MAX_PLIES:
+        return True, 'draw'
+    return False, None
+
+def c_apply(cs: CompactState, cr: CompactRules, code: int) -> bool:
+    b = cs.board
+    kind = code >> 14
+    src = (code >> 7) & 127
+    dst = code & 127
+    Zp = cr.Zp
+    rules = cr.rules
+    if cs.side == GOAT_SIDE:
+        if cs.chain_src >= 0:
+            return False
+        placing = cs.goats_placed < rules.goats_to_place
+        if kind == PLACE and placing:
+            if b[dst] != EMPTY:
+                return False
+            b[dst] = GOAT
+            cs.zkey ^= Zp[dst][GOAT]
+            cs.goats_placed += 1
+        elif kind == MOVE and not placing:
+            if b[src]!=GOAT or b[dst]!=EMPTY or dst not in cr.adj[src]:
+                return False
+            b[src] = EMPTY; b[dst] = GOAT
+            cs.zkey ^= Zp[src][GOAT] ^ Zp[dst][GOAT]
+        else:
+            return False
+        cs.side = TIGER_SIDE
+        cs.move_count += 1
+    elif kind == MOVE:
+        if cs.chain_src >= 0 or b[src]!=TIGER or b[dst]!=EMPTY or dst not in cr.adj[src]:
+            return False
+        b[src] = EMPTY; b[dst] = TIGER
+        cs.zkey ^= Zp[src][TIGER] ^ Zp[dst][TIGER]
+        cs.side = GOAT_SIDE
+        cs.move_count += 1
+    elif kind == JUMP:
+        if cs.chain_src >= 0 and src != cs.chain_src:
+            return False
+        over = cr.jump_over[src].get(dst)
+        if over is None or b[src]!=TIGER or b[over]!=GOAT or b[dst]!=EMPTY or over in cr.safe:
+            return False
+        b[src] = EMPTY; b[over] = EMPTY; b[dst] = TIGER
+        cs.zkey ^= Zp[src][TIGER] ^ Zp[over][GOAT] ^ Zp[dst][TIGER]
+        cs.goats_captured += 1
+        cs.move_count += 1
+        more = False
+        if rules.enable_multijump:
+            for o, l, _ in cr.jumps[dst]:
+                if b[o]==GOAT and b[l]==EMPTY:
+                    more = True
+                    break
+        if more:
+            cs.chain_src = dst
+        else:
+            cs.side = GOAT_SIDE
+            cs.chain_src = -1
+    else:
+        return False
+    if rules.enable_ko:
+        cs.seen_counts[cs.zkey] = cs.seen_counts.get(cs.zkey, 0) + 1
+    return True
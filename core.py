@@ -0,0 +1,531 @@
+import random
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import List, Tuple, Optional, Dict
+
+EMPTY, GOAT, TIGER, ROCK = 0, 1, 2, 3
+MAX_PLIES = 1200
+
+def idx(r: int, c: int, N: int) -> int:
+    return r*N + c
+
+def rcOf(i: int, N: int):
+    return divmod(i, N)
+
+def build_adj(N: int) -> List[List[int]]:
+    ADJ: List[List[int]] = [[] for _ in range(N*N)]
+    dirs4 = [(1,0),(-1,0),(0,1),(0,-1)]
+    dirs8 = dirs4 + [(1,1),(1,-1),(-1,1),(-1,-1)]
+    for r in range(N):
+        for c in range(N):
+            here = idx(r,c,N)
+            use = dirs8 if ((r+c)%2==0) else dirs4
+            for dr,dc in use:
+                rr,cc = r+dr, c+dc
+                if 0<=rr<N and 0<=cc<N:
+                    ADJ[here].append(idx(rr,cc,N))
+    return ADJ
+
+def build_jumps(N: int, ADJ: List[List[int]]) -> List[List[Tuple[int,int]]]:
+    JUMPS: List[List[Tuple[int,int]]] = [[] for _ in range(N*N)]
+    adj_sets = [set(a) for a in ADJ]
+    for r in range(N):
+        for c in range(N):
+            src = idx(r,c,N)
+            for over in ADJ[src]:
+                r0,c0 = rcOf(src,N); r1,c1 = rcOf(over,N)
+                dr, dc = r1 - r0, c1 - c0
+                r2, c2 = r1 + dr, c1 + dc
+                if 0<=r2<N and 0<=c2<N:
+                    land = idx(r2,c2,N)
+                    if land in adj_sets[over]:
+                        JUMPS[src].append((over, land))
+    return JUMPS
+
+DIRS8 = [(1,0),(-1,0),(0,1),(0,-1),(1,1),(1,-1),(-1,1),(-1,-1)]
+
+def num_actions(N: int) -> int:
+    return 17*N*N
+
+def action_to_index(action, N: int) -> int:
+    # Fixed action space: place dst | move src,dir | jump src,dir (dir in DIRS8).
+    if action[0] == 'place':
+        return action[1]
+    _, src, dst = action
+    (r0, c0), (r1, c1) = rcOf(src, N), rcOf(dst, N)
+    if action[0] == 'move':
+        return N*N + 8*src + DIRS8.index((r1-r0, c1-c0))
+    return 9*N*N + 8*src + DIRS8.index(((r1-r0)//2, (c1-c0)//2))
+
+def index_to_action(i: int, N: int):
+    NN = N*N
+    if i < NN:
+        return ('place', i)
+    kind, k = ('move', i - NN) if i < 9*NN else ('jump', i - 9*NN)
+    src, d = divmod(k, 8)
+    dr, dc = DIRS8[d]
+    step = 1 if kind == 'move' else 2
+    r, c = rcOf(src, N)
+    rr, cc = r + step*dr, c + step*dc
+    if not (0<=rr<N and 0<=cc<N):
+        return None
+    return (kind, src, idx(rr, cc, N))
+
+def edge_midpoint_sanctuaries(N: int) -> List[int]:
+    k = N//2
+    return [idx(0,k,N), idx(N-1,k,N), idx(k,0,N), idx(k,N-1,N)]
+
+def build_touched_by(ADJ, JUMPS, safe_nodes):
+    # Per square sq: its neighbours, its capturable jumps as (over, land), and
+    # (t, land) for every tiger square t whose capture goes over sq. Moves and
+    # jumps are symmetric, so these also say which tigers depend on sq.
+    jumps = [tuple((o, l) for o, l in JUMPS[i] if o not in safe_nodes) for i in range(len(ADJ))]
+    overs = [[] for _ in ADJ]
+    for t, js in enumerate(jumps):
+        for o, l in js:
+            overs[o].append((t, l))
+    return tuple((tuple(ADJ[i]), jumps[i], tuple(overs[i])) for i in range(len(ADJ)))
+
+@dataclass
+class Zobrist:
+    piece: List[Tuple[int,int,int,int]]
+    side: int
+    chain: List[int]
+
+@lru_cache(maxsize=None)
+def zobrist_table(N: int) -> Zobrist:
+    rng = random.Random(0x5eed + N)
+    r64 = lambda: rng.getrandbits(64)
+    piece = [(0, r64(), r64(), r64()) for _ in range(N*N)]
+    return Zobrist(piece=piece, side=r64(), chain=[r64() for _ in range(N*N)])
+
+def board_hash(board: List[int], Z: Zobrist) -> int:
+    h = 0
+    for i, v in enumerate(board):
+        if v:
+            h ^= Z.piece[i][v]
+    return h
+
+@dataclass(frozen=True, eq=False)
+class Rules:
+    N: int
+    goats_to_place: int
+    capture_to_win: int
+    ADJ: Tuple[Tuple[int,...], ...]
+    JUMPS: Tuple[Tuple[Tuple[int,int], ...], ...]
+    safe_nodes: frozenset = frozenset()
+    enable_multijump: bool = True
+    enable_ko: bool = True
+    Z: Optional[Zobrist] = field(default=None, repr=False)
+    TOUCHED_BY: Optional[Tuple[Tuple[Tuple[int,...], Tuple[Tuple[int,int],...], Tuple[Tuple[int,int],...]], ...]] = \
+        field(default=None, repr=False)
+
+    def __post_init__(self):
+        # Tables are frozen into tuples so one Rules object can be shared freely.
+        object.__setattr__(self, 'ADJ', tuple(tuple(a) for a in self.ADJ))
+        object.__setattr__(self, 'JUMPS', tuple(tuple(tuple(j) for j in js) for js in self.JUMPS))
+        object.__setattr__(self, 'safe_nodes', frozenset(self.safe_nodes))
+        if self.Z is None:
+            object.__setattr__(self, 'Z', zobrist_table(self.N))
+        if self.TOUCHED_BY is None:
+            object.__setattr__(self, 'TOUCHED_BY', build_touched_by(self.ADJ, self.JUMPS, self.safe_nodes))
+
+    def options(self) -> Tuple[int, int, int, bool, bool, bool]:
+        return (self.N, self.goats_to_place, self.capture_to_win, self.enable_multijump, self.enable_ko,
+                bool(self.safe_nodes))
+
+    def __reduce_ex__(self, protocol):
+        # Memoized rules pickle as their options and resolve to the child's own cached copy.
+        opts = self.options()
+        if _cached_rules(*opts) is self:
+            return (_cached_rules, opts)
+        return object.__reduce_ex__(self, protocol)
+
+@lru_cache(maxsize=64)  # bounded: options can come from untrusted input (server.py)
+def _cached_rules(N: int, goats_to_place: int, capture_to_win: int, enable_multijump: bool, enable_ko: bool,
+                  sanctuaries: bool) -> Rules:
+    ADJ = build_adj(N)
+    JUMPS = build_jumps(N, ADJ)
+    return Rules(
+        N=N,
+        goats_to_place=goats_to_place,
+        capture_to_win=capture_to_win,
+        ADJ=ADJ,
+        JUMPS=JUMPS,
+        safe_nodes=frozenset(edge_midpoint_sanctuaries(N)) if sanctuaries else frozenset(),
+        enable_multijump=enable_multijump,
+        enable_ko=enable_ko,
+    )
+
+def make_rules(N: int = 7, goats_to_place: int = 30, capture_to_win: int = 8, enable_multijump: bool = True,
+               enable_ko: bool = True, sanctuaries: bool = True) -> Rules:
+    return _cached_rules(int(N), int(goats_to_place), int(capture_to_win), bool(enable_multijump),
+                         bool(enable_ko), bool(sanctuaries))
+
+def make_7x7_rules() -> Rules:
+    return make_rules(7)
+
+def make_5x5_rules() -> Rules:
+    # Classic Bagh-Chal: 20 goats, five captures, single jumps, no sanctuaries.
+    return make_rules(5, goats_to_place=20, capture_to_win=5, enable_multijump=False, sanctuaries=False)
+
+@dataclass
+class GameState:
+    board: List[int]
+    goats_placed: int
+    goats_captured: int
+    player: str
+    move_count: int
+    chain_active: bool = False
+    chain_src: Optional[int] = None
+    seen_counts: Dict[int, int] = field(default_factory=dict)
+    zkey: int = 0
+    seen_boards: Optional[Dict[int, Tuple[int,...]]] = None
+    # Tiger moves + captures on this board outside a chain, kept current by
+    # apply_undo/undo; None means unknown and status falls back to a scan.
+    tiger_mobility: Optional[int] = field(default=None, compare=False)
+
+def initial_state(rules: Rules, verify_hash: bool=False) -> GameState:
+    N = rules.N
+    b = [EMPTY]*(N*N)
+    for i in (0, N-1, N*(N-1), N*N-1):
+        b[i] = TIGER
+    gs = GameState(board=b, goats_placed=0, goats_captured=0, player='goat', move_count=0,
+                   zkey=board_hash(b, rules.Z), seen_boards={} if verify_hash else None,
+                   tiger_mobility=count_tiger_mobility(b, rules))
+    record_position(gs)
+    return gs
+
+def refresh_status(gs: GameState, rules: Rules) -> GameState:
+    # For states built by hand or edited in place: recompute the cached status.
+    gs.zkey = board_hash(gs.board, rules.Z)
+    gs.tiger_mobility = count_tiger_mobility(gs.board, rules)
+    return gs
+
+def position_key(gs: GameState, rules: Rules) -> int:
+    h = gs.zkey
+    if gs.player == 'tiger':
+        h ^= rules.Z.side
+    if gs.chain_active and gs.chain_src is not None:
+        h ^= rules.Z.chain[gs.chain_src]
+    return h
+
+_COUNT_MIX = 0x9E3779B97F4A7C15
+
+def position_key_with_counts(gs: GameState, rules: Rules, key: Optional[int] = None) -> int:
+    # position_key (or a given key, e.g. a symmetry-canonical one) with the
+    # capture and placement counts mixed in, for tables shared across phases.
+    if key is None:
+        key = position_key(gs, rules)
+    return key ^ ((gs.goats_captured + 64*gs.goats_placed) * _COUNT_MIX & 0xFFFFFFFFFFFFFFFF)
+
+def record_position(gs: GameState) -> int:
+    key = gs.zkey
+    gs.seen_counts[key] = gs.seen_counts.get(key, 0) + 1
+    if gs.seen_boards is not None:
+        board = tuple(gs.board)
+        if gs.seen_boards.setdefault(key, board) != board:
+            raise RuntimeError(f"zobrist collision on key {key:#018x}")
+    return key
+
+def phase(gs: GameState, rules: Rules) -> str:
+    return 'placement' if gs.goats_placed < rules.goats_to_place else 'movement'
+
+def tiger_has_more_jumps_from(pos: int, gs: GameState, rules: Rules) -> bool:
+    b = gs.board
+    for over, land in rules.JUMPS[pos]:
+        if b[over]==GOAT and (over not in rules.safe_nodes) and b[land]==EMPTY:
+            return True
+    return False
+
+def _tiger_count(b: List[int], adj, jumps) -> int:
+    n = 0
+    for x in adj:
+        if b[x]==EMPTY:
+            n += 1
+    for o, l in jumps:
+        if b[o]==GOAT and b[l]==EMPTY:
+            n += 1
+    return n
+
+def count_tiger_mobility(board: List[int], rules: Rules) -> int:
+    T = rules.TOUCHED_BY
+    return sum(_tiger_count(board, T[t][0], T[t][1]) for t, v in enumerate(board) if v==TIGER)
+
+def mobility_delta(b: List[int], rules: Rules, sq: int, v: int) -> int:
+    # Change in count_tiger_mobility if b[sq] became v; only tigers whose
+    # neighbourhood contains sq are looked at.
+    old = b[sq]
+    if old == v:
+        return 0
+    adj, jumps, overs = rules.TOUCHED_BY[sq]
+    d = 0
+    de = (v==EMPTY) - (old==EMPTY)
+    if de:
+        for t in adj:
+            if b[t]==TIGER:
+                d += de
+        for o, t in jumps:
+            if b[t]==TIGER and b[o]==GOAT:
+                d += de
+    dg = (v==GOAT) - (old==GOAT)
+    if dg:
+        for t, l in overs:
+            if b[t]==TIGER and b[l]==EMPTY:
+                d += dg
+    if old == TIGER:
+        d -= _tiger_count(b, adj, jumps)
+    elif v == TIGER:
+        d += _tiger_count(b, adj, jumps)
+    return d
+
+def any_legal_move(gs: GameState, rules: Rules, role: Optional[str]=None) -> bool:
+    # legal_actions(...) != [] without building the list.
+    role = role or gs.player
+    b = gs.board
+    if role == 'goat':
+        if gs.chain_active:
+            return False
+        if phase(gs, rules) == 'placement':
+            return EMPTY in b
+        for i, v in enumerate(b):
+            if v==GOAT:
+                for d in rules.ADJ[i]:
+                    if b[d]==EMPTY:
+                        return True
+        return False
+    if gs.chain_active and gs.chain_src is not None and rules.enable_multijump:
+        return tiger_has_more_jumps_from(gs.chain_src, gs, rules)
+    if gs.tiger_mobility is not None:
+        return gs.tiger_mobility > 0
+    T = rules.TOUCHED_BY
+    for i, v in enumerate(b):
+        if v==TIGER and _tiger_count(b, T[i][0], T[i][1]):
+            return True
+    return False
+
+def legal_actions(gs: GameState, rules: Rules, role: Optional[str]=None):
+    role = role or gs.player
+    acts = []
+    b = gs.board
+    N = rules.N
+    if role == 'goat':
+        if gs.chain_active:
+            return []
+        if phase(gs, rules) == 'placement':
+            for i in range(N*N):
+                if b[i]==EMPTY:
+                    acts.append(('place', i))
+        else:
+            for i in range(N*N):
+                if b[i]==GOAT:
+                    for d in rules.ADJ[i]:
+                        if b[d]==EMPTY:
+                            acts.append(('move', i, d))
+    else: # tiger
+        if gs.chain_active and gs.chain_src is not None and rules.enable_multijump:
+            i = gs.chain_src
+            for over, land in rules.JUMPS[i]:
+                if b[over]==GOAT and (over not in rules.safe_nodes) and b[land]==EMPTY:
+                    acts.append(('jump', i, land))
+            return acts
+        for i in range(N*N):
+            if b[i]==TIGER:
+                for d in rules.ADJ[i]:
+                    if b[d]==EMPTY:
+                        acts.append(('move', i, d))
+                for over, land in rules.JUMPS[i]:
+                    if b[over]==GOAT and (over not in rules.safe_nodes) and b[land]==EMPTY:
+                        acts.append(('jump', i, land))
+    return acts
+
+def terminal_status(gs: GameState, rules: Rules):
+    if rules.enable_ko:
+        if gs.seen_counts.get(gs.zkey, 0) >= 3:
+            return 'draw', 'ko'
+    if gs.goats_captured >= rules.capture_to_win:
+        return 'tiger', 'capture'
+    if gs.player == 'tiger' and not any_legal_move(gs, rules, 'tiger'):
+        return 'goat', 'blocked'
+    if gs.move_count >= MAX_PLIES:
+        return 'draw', 'move_cap'
+    return None, None
+
+def is_terminal(gs: GameState, rules: Rules):
+    winner, _ = terminal_status(gs, rules)
+    return winner is not None, winner
+
+def apply(gs: GameState, rules: Rules, action):
+    return apply_undo(gs, rules, action) is not None
+
+def apply_undo(gs: GameState, rules: Rules, action):
+    kind = action[0]
+    b = gs.board
+    mob = gs.tiger_mobility
+    prev = (gs.player, gs.chain_active, gs.chain_src, gs.zkey, mob)
+    Zp = rules.Z.piece
+    src = over = None
+    if gs.player == 'goat':
+        if gs.chain_active:
+            return None
+        if kind == 'place' and phase(gs, rules) == 'placement':
+            _, dst = action
+            if b[dst] != EMPTY:
+                return None
+            if mob is not None:
+                gs.tiger_mobility = mob + mobility_delta(b, rules, dst, GOAT)
+            b[dst] = GOAT
+            gs.zkey ^= Zp[dst][GOAT]
+            gs.goats_placed += 1
+            gs.player = 'tiger'
+            gs.move_count += 1
+        elif kind == 'move' and phase(gs, rules) == 'movement':
+            _, src, dst = action
+            if b[src]==GOAT and b[dst]==EMPTY and dst in rules.ADJ[src]:
+                if mob is not None:
+                    mob += mobility_delta(b, rules, src, EMPTY)
+                    b[src] = EMPTY
+                    gs.tiger_mobility = mob + mobility_delta(b, rules, dst, GOAT)
+                b[src], b[dst] = EMPTY, GOAT
+                gs.zkey ^= Zp[src][GOAT] ^ Zp[dst][GOAT]
+                gs.player = 'tiger'
+                gs.move_count += 1
+            else:
+                return None
+        else:
+            return None
+    else:
+        if kind == 'move':
+            if gs.chain_active:
+                return None
+            _, src, dst = action
+            if b[src]==TIGER and b[dst]==EMPTY and dst in rules.ADJ[src]:
+                if mob is not None:
+                    mob += mobility_delta(b, rules, src, EMPTY)
+                    b[src] = EMPTY
+                    gs.tiger_mobility = mob + mobility_delta(b, rules, dst, TIGER)
+                b[src], b[dst] = EMPTY, TIGER
+                gs.zkey ^= Zp[src][TIGER] ^ Zp[dst][TIGER]
+                gs.player = 'goat'
+                gs.move_count += 1
+            else:
+                return None
+        elif kind == 'jump':
+            _, src, dst = action
+            if gs.chain_active and src != gs.chain_src:
+                return None
+            for o,l in rules.JUMPS[src]:
+                if l==dst:
+                    over=o; break
+            if over is None or b[src]!=TIGER or b[over]!=GOAT or b[dst]!=EMPTY or (over in rules.safe_nodes):
+                return None
+            if mob is not None:
+                mob += mobility_delta(b, rules, src, EMPTY)
+                b[src] = EMPTY
+                mob += mobility_delta(b, rules, over, EMPTY)
+                b[over] = EMPTY
+                gs.tiger_mobility = mob + mobility_delta(b, rules, dst, TIGER)
+            b[src], b[over], b[dst] = EMPTY, EMPTY, TIGER
+            gs.zkey ^= Zp[src][TIGER] ^ Zp[over][GOAT] ^ Zp[dst][TIGER]
+            gs.goats_captured += 1
+            gs.move_count += 1
+            if rules.enable_multijump and tiger_has_more_jumps_from(dst, gs, rules):
+                gs.player = 'tiger'
+                gs.chain_active = True
+                gs.chain_src = dst
+            else:
+                gs.player = 'goat'
+                gs.chain_active = False
+                gs.chain_src = None
+        else:
+            return None
+    key = record_position(gs) if rules.enable_ko else None
+    return (kind, src, over, dst) + prev + (key,)
+
+def undo(gs: GameState, rules: Rules, rec) -> None:
+    kind, src, over, dst, player, chain_active, chain_src, zkey, mobility, key = rec
+    if key is not None:
+        n = gs.seen_counts[key] - 1
+        if n:
+            gs.seen_counts[key] = n
+        else:
+            del gs.seen_counts[key]
+            if gs.seen_boards is not None:
+                del gs.seen_boards[key]
+    b = gs.board
+    if kind == 'place':
+        b[dst] = EMPTY
+        gs.goats_placed -= 1
+    elif kind == 'move':
+        b[src], b[dst] = b[dst], EMPTY
+    else:
+        b[src], b[over], b[dst] = TIGER, GOAT, EMPTY
+        gs.goats_captured -= 1
+    gs.move_count -= 1
+    gs.player, gs.chain_active, gs.chain_src, gs.zkey = player, chain_active, chain_src, zkey
+    gs.tiger_mobility = mobility
+
+def tiger_greedy(gs: GameState, rules: Rules):
+    b = gs.board
+    if gs.chain_active and gs.chain_src is not None:
+        i = gs.chain_src
+        best = None; best_next = -1
+        for over, land in rules.JUMPS[i]:
+            if b[over]==GOAT and (over not in rules.safe_nodes) and b[land]==EMPTY:
+                nxt = 0
+                for o2, l2 in rules.JUMPS[land]:
+                    if b[o2]==GOAT and (o2 not in rules.safe_nodes) and b[l2]==EMPTY:
+                        nxt += 1
+                if nxt > best_next:
+                    best_next, best = nxt, ('jump', i, land)
+        return best
+    tigers = [i for i, v in enumerate(b) if v==TIGER]
+    for i in tigers:
+        for over, land in rules.JUMPS[i]:
+            if b[over]==GOAT and (over not in rules.safe_nodes) and b[land]==EMPTY:
+                return ('jump', i, land)
+    # Candidates are ranked by their change in tiger mobility; the current
+    # total is the same for all of them and is left out.
+    best = None; best_mob = -10**9
+    for i in tigers:
+        base = mobility_delta(b, rules, i, EMPTY)
+        b[i] = EMPTY
+        for d in rules.ADJ[i]:
+            if b[d]==EMPTY:
+                mob = base + mobility_delta(b, rules, d, TIGER)
+                if mob > best_mob:
+                    best_mob, best = mob, ('move', i, d)
+        b[i] = TIGER
+    return best
+
+def goat_greedy(gs: GameState, rules: Rules):
+    b = gs.board; N = rules.N
+    if phase(gs, rules)=='placement':
+        near = set()
+        for t, v in enumerate(b):
+            if v==TIGER:
+                near.update(rules.ADJ[t])
+        best = None; best_mob = 10**9
+        for dst in range(N*N):
+            if b[dst]==EMPTY:
+                danger = dst in near
+                mob = mobility_delta(b, rules, dst, GOAT)
+                if danger:
+                    mob += 3
+                if mob < best_mob:
+                    best_mob, best = mob, ('place', dst)
+        return best
+    best = None; best_mob = 10**9
+    for g in range(N*N):
+        if b[g]==GOAT:
+            base = None
+            for d in rules.ADJ[g]:
+                if b[d]==EMPTY:
+                    if base is None:
+                        base = mobility_delta(b, rules, g, EMPTY)
+                    b[g] = EMPTY
+                    mob = base + mobility_delta(b, rules, d, GOAT)
+                    b[g] = GOAT
+                    if mob < best_mob:
+                        best_mob, best = mob, ('move', g, d)
+    return best
@@ -0,0 +1,230 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from core import (EMPTY, GOAT, TIGER, MAX_PLIES, Rules, GameState, make_7x7_rules, num_actions, index_to_action,
+                  board_hash, count_tiger_mobility)
+
+GOAT_TO_MOVE, TIGER_TO_MOVE = 0, 1
+
+class BatchBaghChalEnv:
+    # B independent games stepped together. Boards are a (B, N*N) int8 array,
+    # actions are indices into the fixed space of core.action_to_index, and
+    # finished games are reset in place by step().
+    def __init__(self, batch_size: int, rules: Optional[Rules] = None, seed: Optional[int] = None):
+        self.rules = rules = rules or make_7x7_rules()
+        self.B = batch_size
+        self.N = N = rules.N
+        self.NN = NN = N*N
+        self.A = A = num_actions(N)
+        self.rng = np.random.default_rng(seed)
+
+        kind = np.full(A, -1, np.int8)
+        src = np.zeros(A, np.int64); dst = np.zeros(A, np.int64); over = np.zeros(A, np.int64)
+        for i in range(A):
+            a = index_to_action(i, N)
+            if a is None:
+                continue
+            if a[0] == 'place':
+                kind[i], dst[i] = 0, a[1]
+            elif a[0] == 'move' and a[2] in rules.ADJ[a[1]]:
+                kind[i], src[i], dst[i] = 1, a[1], a[2]
+            elif a[0] == 'jump':
+                for o, l in rules.JUMPS[a[1]]:
+                    if l == a[2] and o not in rules.safe_nodes:
+                        kind[i], src[i], dst[i], over[i] = 2, a[1], a[2], o
+        self.kind, self.src, self.dst, self.over = kind, src, dst, over
+        self.move_slots = np.flatnonzero(kind == 1)
+        self.jump_slots = np.flatnonzero(kind == 2)
+
+        jo = np.zeros((NN, 8), np.int64); jl = np.zeros((NN, 8), np.int64); jv = np.zeros((NN, 8), bool)
+        for i in range(NN):
+            k = 0
+            for o, l in rules.JUMPS[i]:
+                if o not in rules.safe_nodes:
+                    jo[i, k], jl[i, k], jv[i, k] = o, l, True
+                    k += 1
+        self.jump_over, self.jump_land, self.jump_valid = jo, jl, jv
+
+        Z = rules.Z.piece
+        self.Zp = np.array([[z for z in row] for row in Z], dtype=np.uint64)
+        init = [EMPTY]*NN
+        for i in (0, N-1, N*(N-1), NN-1):
+            init[i] = TIGER
+        self.init_board = np.array(init, np.int8)
+        self.init_key = board_hash(init, rules.Z)
+
+        B = batch_size
+        self.boards = np.zeros((B, NN), np.int8)
+        self.player = np.zeros(B, np.int8)
+        self.goats_placed = np.zeros(B, np.int32)
+        self.goats_captured = np.zeros(B, np.int32)
+        self.move_count = np.zeros(B, np.int32)
+        self.chain_src = np.full(B, -1, np.int64)
+        self.zkey = np.zeros(B, np.uint64)
+        self.ko_count = np.zeros(B, np.int32)
+        self.seen: List[Dict[int, int]] = [{} for _ in range(B)]
+        self._rows = np.arange(B)
+        self._mask: Optional[np.ndarray] = None
+
+    def reset(self, rows: Optional[np.ndarray] = None):
+        if rows is None:
+            rows = self._rows
+        self.boards[rows] = self.init_board
+        self.player[rows] = GOAT_TO_MOVE
+        self.goats_placed[rows] = 0
+        self.goats_captured[rows] = 0
+        self.move_count[rows] = 0
+        self.chain_src[rows] = -1
+        self.zkey[rows] = np.uint64(self.init_key)
+        self.ko_count[rows] = 1
+        for r in np.atleast_1d(rows):
+            self.seen[r] = {self.init_key: 1}
+        self._mask = None
+        return self.observe()
+
+    def observe(self):
+        return {
+            'board': self.boards.copy(),
+            'player': self.player.copy(),
+            'chain_src': self.chain_src.copy(),
+            'goats_placed': self.goats_placed.copy(),
+            'goats_captured': self.goats_captured.copy(),
+            'legal_mask': self.legal_mask().copy(),
+        }
+
+    def legal_mask(self) -> np.ndarray:
+        if self._mask is not None:
+            return self._mask
+        b = self.boards
+        goat = self.player == GOAT_TO_MOVE
+        chain = self.chain_src >= 0
+        placing = self.goats_placed < self.rules.goats_to_place
+        mask = np.zeros((self.B, self.A), bool)
+        mask[:, :self.NN] = (b == EMPTY) & (goat & placing & ~chain)[:, None]
+
+        ms = self.move_slots
+        piece = np.where(goat, GOAT, TIGER).astype(np.int8)
+        can_move = np.where(goat, ~placing, True) & ~chain
+        mask[:, ms] = ((b[:, self.src[ms]] == piece[:, None]) & (b[:, self.dst[ms]] == EMPTY)
+                       & can_move[:, None])
+
+        js = self.jump_slots
+        jsrc = self.src[js]
+        from_ok = ~chain[:, None] | (self.chain_src[:, None] == jsrc[None, :])
+        mask[:, js] = ((b[:, jsrc] == TIGER) & (b[:, self.over[js]] == GOAT) & (b[:, self.dst[js]] == EMPTY)
+                       & ~goat[:, None] & from_ok)
+        self._mask = mask
+        return mask
+
+    def sample_legal(self, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+        rng = rng or self.rng
+        mask = self.legal_mask()
+        noise = rng.random(mask.shape)
+        noise[~mask] = -1.0
+        return noise.argmax(axis=1)
+
+    def step(self, actions: np.ndarray, check: bool = True):
+        rules = self.rules
+        actions = np.asarray(actions, np.int64)
+        rows = self._rows
+        mask = self.legal_mask()
+        # A game whose side to move has no legal action (only set_state can
+        # leave one waiting) ignores its action; status() then ends it.
+        live = mask.any(axis=1)
+        if check and not (mask[rows, actions] | ~live).all():
+            bad = np.flatnonzero(~(mask[rows, actions] | ~live))
+            raise ValueError(f"illegal actions in games {bad.tolist()}")
+        b = self.boards
+        kind = np.where(live, self.kind[actions], -1)
+        src, dst, over = self.src[actions], self.dst[actions], self.over[actions]
+        mover = self.player.copy()
+        Zp = self.Zp
+
+        p = kind == 0
+        if p.any():
+            r = rows[p]
+            b[r, dst[p]] = GOAT
+            self.goats_placed[r] += 1
+            self.zkey[r] ^= Zp[dst[p], GOAT]
+        m = kind == 1
+        if m.any():
+            r = rows[m]
+            piece = b[r, src[m]]
+            b[r, src[m]] = EMPTY
+            b[r, dst[m]] = piece
+            self.zkey[r] ^= Zp[src[m], piece] ^ Zp[dst[m], piece]
+        j = kind == 2
+        more = np.zeros(self.B, bool)
+        if j.any():
+            r = rows[j]
+            b[r, src[j]] = EMPTY
+            b[r, over[j]] = EMPTY
+            b[r, dst[j]] = TIGER
+            self.goats_captured[r] += 1
+            self.zkey[r] ^= Zp[src[j], TIGER] ^ Zp[over[j], GOAT] ^ Zp[dst[j], TIGER]
+            if rules.enable_multijump:
+                d = dst[j]
+                jo, jl = self.jump_over[d], self.jump_land[d]
+                rr = r[:, None]
+                more[r] = ((b[rr, jo] == GOAT) & (b[rr, jl] == EMPTY) & self.jump_valid[d]).any(axis=1)
+        self.player = np.where(more, TIGER_TO_MOVE, np.where(live, 1 - mover, mover)).astype(np.int8)
+        self.chain_src = np.where(more, dst, np.where(live, -1, self.chain_src))
+        self.move_count += live
+        self._mask = None
+
+        if rules.enable_ko:
+            counts = []
+            for seen, k, moved in zip(self.seen, self.zkey.tolist(), live.tolist()):
+                n = seen[k] = seen.get(k, 0) + moved
+                counts.append(n)
+            self.ko_count[:] = counts
+        else:
+            self.ko_count[:] = 0
+
+        winner = self.status()
+        done = winner != 0
+        reward = np.where(winner == np.where(mover == GOAT_TO_MOVE, GOAT, TIGER), 1.0,
+                          np.where((winner == GOAT) | (winner == TIGER), -1.0, 0.0)).astype(np.float32)
+        info = {'winner': winner, 'plies': self.move_count.copy(), 'captures': self.goats_captured.copy()}
+        if done.any():
+            self.reset(rows[done])
+        return self.observe(), reward, done, info
+
+    def status(self) -> np.ndarray:
+        # Mirrors is_terminal: 0 ongoing, GOAT/TIGER for a win, 3 for a draw.
+        # Goats left without a legal move draw, as tournament.py's 'no_move'.
+        rules = self.rules
+        winner = np.zeros(self.B, np.int8)
+        ko = self.ko_count >= 3 if rules.enable_ko else np.zeros(self.B, bool)
+        cap = self.goats_captured >= rules.capture_to_win
+        stuck = ~self.legal_mask().any(axis=1)
+        blocked = (self.player == TIGER_TO_MOVE) & stuck
+        cap_ply = self.move_count >= MAX_PLIES
+        winner[cap_ply | stuck] = 3
+        winner[blocked] = GOAT
+        winner[cap] = TIGER
+        winner[ko] = 3
+        return winner
+
+    def to_state(self, r: int) -> GameState:
+        cs = int(self.chain_src[r])
+        board = self.boards[r].tolist()
+        return GameState(board=board, goats_placed=int(self.goats_placed[r]),
+                         goats_captured=int(self.goats_captured[r]),
+                         player='goat' if self.player[r] == GOAT_TO_MOVE else 'tiger',
+                         move_count=int(self.move_count[r]), chain_active=cs >= 0,
+                         chain_src=cs if cs >= 0 else None, seen_counts=dict(self.seen[r]),
+                         zkey=int(self.zkey[r]), tiger_mobility=count_tiger_mobility(board, self.rules))
+
+    def set_state(self, r: int, gs: GameState):
+        self.boards[r] = gs.board
+        self.player[r] = GOAT_TO_MOVE if gs.player == 'goat' else TIGER_TO_MOVE
+        self.goats_placed[r] = gs.goats_placed
+        self.goats_captured[r] = gs.goats_captured
+        self.move_count[r] = gs.move_count
+        self.chain_src[r] = gs.chain_src if gs.chain_active and gs.chain_src is not None else -1
+        self.zkey[r] = np.uint64(gs.zkey)
+        self.seen[r] = dict(gs.seen_counts)
+        self.ko_count[r] = gs.seen_counts.get(gs.zkey, 0)
+        self._mask = None
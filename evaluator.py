@@ -0,0 +1,194 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core import EMPTY, GOAT, TIGER, Rules, GameState
+
+PLANES = ('goats', 'tigers', 'empty', 'sanctuary', 'side', 'chain', 'placement')
+
+class FeatureEncoder:
+    # GameState -> float32 planes of shape (len(PLANES), N, N). 'side' is all
+    # ones when the tiger moves, 'placement' holds goats_placed/goats_to_place.
+    def __init__(self, rules: Rules):
+        self.rules = rules
+        self.N = N = rules.N
+        self.NN = N*N
+        self.shape = (len(PLANES), N, N)
+        self.sanctuary = np.zeros(self.NN, np.float32)
+        self.sanctuary[list(rules.safe_nodes)] = 1.0
+
+    def buffer(self, batch: int) -> np.ndarray:
+        return np.zeros((batch,) + self.shape, np.float32)
+
+    def encode(self, gs: GameState, out: Optional[np.ndarray] = None) -> np.ndarray:
+        if out is None:
+            out = np.empty(self.shape, np.float32)
+        planes = out.reshape(len(PLANES), self.NN)
+        board = np.frombuffer(bytes(gs.board), np.uint8)
+        np.equal(board, GOAT, out=planes[0], casting='unsafe')
+        np.equal(board, TIGER, out=planes[1], casting='unsafe')
+        np.equal(board, EMPTY, out=planes[2], casting='unsafe')
+        planes[3] = self.sanctuary
+        planes[4] = gs.player == 'tiger'
+        planes[5] = 0.0
+        if gs.chain_active and gs.chain_src is not None:
+            planes[5, gs.chain_src] = 1.0
+        planes[6] = gs.goats_placed / self.rules.goats_to_place
+        return out
+
+    def encode_batch(self, states: Sequence[GameState], out: Optional[np.ndarray] = None) -> np.ndarray:
+        if out is None:
+            out = self.buffer(len(states))
+        for i, gs in enumerate(states):
+            self.encode(gs, out[i])
+        return out[:len(states)]
+
+class MLPModel:
+    # Stand-in for a learned evaluator: two tanh layers with random weights.
+    # Any callable mapping (B, C, N, N) float32 to (B,) values can replace it.
+    def __init__(self, encoder: FeatureEncoder, hidden: int = 128, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        n_in = int(np.prod(encoder.shape))
+        self.w1 = (rng.standard_normal((n_in, hidden)) / np.sqrt(n_in)).astype(np.float32)
+        self.b1 = np.zeros(hidden, np.float32)
+        self.w2 = (rng.standard_normal(hidden) / np.sqrt(hidden)).astype(np.float32)
+
+    def __call__(self, x: np.ndarray) -> np.ndarray:
+        h = np.tanh(x.reshape(len(x), -1) @ self.w1 + self.b1)
+        return np.tanh(h @ self.w2)
+
+@dataclass
+class EvalStats:
+    requests: int = 0
+    batches: int = 0
+    started: float = field(default_factory=time.perf_counter)
+    batch_sizes: Dict[int, int] = field(default_factory=dict)
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=10000))
+
+    def record(self, size: int, latencies: List[float]):
+        self.requests += size
+        self.batches += 1
+        self.batch_sizes[size] = self.batch_sizes.get(size, 0) + 1
+        self.latencies.extend(latencies)
+
+    @property
+    def mean_batch(self) -> float:
+        return self.requests / self.batches if self.batches else 0.0
+
+    @property
+    def throughput(self) -> float:
+        dt = time.perf_counter() - self.started
+        return self.requests / dt if dt > 0 else 0.0
+
+    def latency(self, q: float) -> float:
+        if not self.latencies:
+            return 0.0
+        xs = sorted(self.latencies)
+        return xs[min(len(xs) - 1, int(q * len(xs)))]
+
+    def summary(self) -> str:
+        return (f"{self.requests} evals in {self.batches} batches (mean {self.mean_batch:.1f})  "
+                f"{self.throughput:,.0f} evals/s  latency p50 {1e3*self.latency(0.5):.2f} ms  "
+                f"p99 {1e3*self.latency(0.99):.2f} ms")
+
+class EvalService:
+    # Coalesces evaluate() calls from many coroutines into micro-batches: a
+    # batch is sent to the model when it reaches max_batch or when its oldest
+    # request has waited max_delay seconds.
+    def __init__(self, model: Callable[[np.ndarray], np.ndarray], encoder: FeatureEncoder, max_batch: int = 64,
+                 max_delay: float = 0.002):
+        self.model = model
+        self.encoder = encoder
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.stats = EvalStats()
+        self._buf = encoder.buffer(max_batch)
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._batch: List[Tuple[GameState, asyncio.Future, float]] = []
+
+    async def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self.stats = EvalStats()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self):
+        # Stops the batching task; requests still queued or in the unfinished
+        # batch fail instead of waiting forever.
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        pending = [fut for _, fut, _ in self._batch]
+        self._batch = []
+        q, self._queue = self._queue, None
+        while q is not None and not q.empty():
+            pending.append(q.get_nowait()[1])
+        for fut in pending:
+            if not fut.done():
+                fut.set_exception(RuntimeError("service closed"))
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def evaluate(self, gs: GameState) -> float:
+        # Value of gs for the side to move. The position is encoded when its
+        # batch is assembled, so gs must not change until this returns.
+        if self._queue is None:
+            raise RuntimeError("EvalService is not running; use start() or 'async with'")
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((gs, fut, time.perf_counter()))
+        return await fut
+
+    async def _run(self):
+        q = self._queue
+        while True:
+            first = await q.get()
+            batch = self._batch = [first]
+            deadline = first[2] + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(q.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(q.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            n = len(batch)
+            x = self._buf[:n]
+            try:
+                for i, (gs, _, _) in enumerate(batch):
+                    self.encoder.encode(gs, x[i])
+                values = self.model(x)
+                if len(values) != n:
+                    raise ValueError(f"model returned {len(values)} values for a batch of {n}")
+            except Exception as e:
+                for _, fut, _ in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                self._batch = []
+                continue
+            now = time.perf_counter()
+            for (_, fut, t0), v in zip(batch, values):
+                if not fut.done():
+                    fut.set_result(float(v))
+            self._batch = []
+            self.stats.record(n, [now - t0 for _, _, t0 in batch])
+            await asyncio.sleep(0)  # let the resolved callers enqueue their next request
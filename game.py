@@ -1,293 +1,25 @@
 
+import queue
+import threading
 import tkinter as tk
+from dataclasses import replace
 from tkinter import messagebox
-from dataclasses import dataclass, field
-from typing import List, Tuple, Optional, Dict
-
-EMPTY, GOAT, TIGER, ROCK = 0, 1, 2, 3
-
-def idx(r: int, c: int, N: int) -> int:
-    return r*N + c
-
-def rcOf(i: int, N: int):
-    return divmod(i, N)
-
-def build_adj(N: int) -> List[List[int]]:
-    ADJ: List[List[int]] = [[] for _ in range(N*N)]
-    dirs4 = [(1,0),(-1,0),(0,1),(0,-1)]
-    dirs8 = dirs4 + [(1,1),(1,-1),(-1,1),(-1,-1)]
-    for r in range(N):
-        for c in range(N):
-            here = idx(r,c,N)
-            use = dirs8 if ((r+c)%2==0) else dirs4
-            for dr,dc in use:
-                rr,cc = r+dr, c+dc
-                if 0<=rr<N and 0<=cc<N:
-                    ADJ[here].append(idx(rr,cc,N))
-    return ADJ
-
-def build_jumps(N: int, ADJ: List[List[int]]) -> List[List[Tuple[int,int]]]:
-    JUMPS: List[List[Tuple[int,int]]] = [[] for _ in range(N*N)]
-    for r in range(N):
-        for c in range(N):
-            src = idx(r,c,N)
-            for over in ADJ[src]:
-                r0,c0 = rcOf(src,N); r1,c1 = rcOf(over,N)
-                dr, dc = r1 - r0, c1 - c0
-                r2, c2 = r1 + dr, c1 + dc
-                if 0<=r2<N and 0<=c2<N:
-                    land = idx(r2,c2,N)
-                    if land in ADJ[over]:
-                        JUMPS[src].append((over, land))
-    return JUMPS
-
-def edge_midpoint_sanctuaries(N: int) -> List[int]:
-    k = N//2
-    return [idx(0,k,N), idx(N-1,k,N), idx(k,0,N), idx(k,N-1,N)]
-
-@dataclass
-class Rules:
-    N: int
-    goats_to_place: int
-    capture_to_win: int
-    ADJ: List[List[int]]
-    JUMPS: List[List[Tuple[int,int]]]
-    safe_nodes: set = field(default_factory=set)
-    enable_multijump: bool = True
-    enable_ko: bool = True
-
-def make_7x7_rules() -> Rules:
-    N = 7
-    ADJ = build_adj(N)
-    JUMPS = build_jumps(N, ADJ)
-    return Rules(
-        N=N,
-        goats_to_place=30,
-        capture_to_win=8,
-        ADJ=ADJ,
-        JUMPS=JUMPS,
-        safe_nodes=set(edge_midpoint_sanctuaries(N)),
-        enable_multijump=True,
-        enable_ko=True,
-    )
-
-@dataclass
-class GameState:
-    board: List[int]
-    goats_placed: int
-    goats_captured: int
-    player: str
-    move_count: int
-    chain_active: bool = False
-    chain_src: Optional[int] = None
-    seen_counts: Dict[Tuple[int,...], int] = field(default_factory=dict)
-
-def initial_state(rules: Rules) -> GameState:
-    N = rules.N
-    b = [EMPTY]*(N*N)
-    for i in (0, N-1, N*(N-1), N*N-1):
-        b[i] = TIGER
-    gs = GameState(board=b, goats_placed=0, goats_captured=0, player='goat', move_count=0)
-    key = tuple(gs.board)
-    gs.seen_counts[key] = gs.seen_counts.get(key, 0) + 1
-    return gs
-
-def phase(gs: GameState, rules: Rules) -> str:
-    return 'placement' if gs.goats_placed < rules.goats_to_place else 'movement'
-
-def tiger_has_more_jumps_from(pos: int, gs: GameState, rules: Rules) -> bool:
-    b = gs.board
-    for over, land in rules.JUMPS[pos]:
-        if b[over]==GOAT and (over not in rules.safe_nodes) and b[land]==EMPTY:
-            return True
-    return False
-
-def legal_actions(gs: GameState, rules: Rules, role: Optional[str]=None):
-    role = role or gs.player
-    acts = []
-    b = gs.board
-    N = rules.N
-    if role == 'goat':
-        if gs.chain_active:
-            return []
-        if phase(gs, rules) == 'placement':
-            for i in range(N*N):
-                if b[i]==EMPTY:
-                    acts.append(('place', i))
-        else:
-            for i in range(N*N):
-                if b[i]==GOAT:
-                    for d in rules.ADJ[i]:
-                        if b[d]==EMPTY:
-                            acts.append(('move', i, d))
-    else: # tiger
-        if gs.chain_active and gs.chain_src is not None and rules.enable_multijump:
-            i = gs.chain_src
-            for over, land in rules.JUMPS[i]:
-                if b[over]==GOAT and (over not in rules.safe_nodes) and b[land]==EMPTY:
-                    acts.append(('jump', i, land))
-            return acts
-        for i in range(N*N):
-            if b[i]==TIGER:
-                for d in rules.ADJ[i]:
-                    if b[d]==EMPTY:
-                        acts.append(('move', i, d))
-                for over, land in rules.JUMPS[i]:
-                    if b[over]==GOAT and (over not in rules.safe_nodes) and b[land]==EMPTY:
-                        acts.append(('jump', i, land))
-    return acts
-
-def is_terminal(gs: GameState, rules: Rules):
-    if rules.enable_ko:
-        key = tuple(gs.board)
-        if gs.seen_counts.get(key, 0) >= 3:
-            return True, 'draw'
-    if gs.goats_captured >= rules.capture_to_win:
-        return True, 'tiger'
-    if gs.player == 'tiger' and not legal_actions(gs, rules, 'tiger'):
-        return True, 'goat'
-    if gs.move_count >= 1200:
-        return True, 'draw'
-    return False, None
-
-def apply(gs: GameState, rules: Rules, action):
-    kind = action[0]
-    b = gs.board
-    if gs.player == 'goat':
-        if gs.chain_active:
-            return False
-        if kind == 'place' and phase(gs, rules) == 'placement':
-            _, dst = action
-            if b[dst] != EMPTY:
-                return False
-            b[dst] = GOAT
-            gs.goats_placed += 1
-            gs.player = 'tiger'
-            gs.move_count += 1
-        elif kind == 'move' and phase(gs, rules) == 'movement':
-            _, src, dst = action
-            if b[src]==GOAT and b[dst]==EMPTY and dst in rules.ADJ[src]:
-                b[src], b[dst] = EMPTY, GOAT
-                gs.player = 'tiger'
-                gs.move_count += 1
-            else:
-                return False
-        else:
-            return False
-    else:
-        if kind == 'move':
-            if gs.chain_active:
-                return False
-            _, src, dst = action
-            if b[src]==TIGER and b[dst]==EMPTY and dst in rules.ADJ[src]:
-                b[src], b[dst] = EMPTY, TIGER
-                gs.player = 'goat'
-                gs.move_count += 1
-            else:
-                return False
-        elif kind == 'jump':
-            _, src, dst = action
-            if gs.chain_active and src != gs.chain_src:
-                return False
-            over = None
-            for o,l in rules.JUMPS[src]:
-                if l==dst:
-                    over=o; break
-            if over is None or b[src]!=TIGER or b[over]!=GOAT or b[dst]!=EMPTY or (over in rules.safe_nodes):
-                return False
-            b[src], b[over], b[dst] = EMPTY, EMPTY, TIGER
-            gs.goats_captured += 1
-            gs.move_count += 1
-            if rules.enable_multijump and tiger_has_more_jumps_from(dst, gs, rules):
-                gs.player = 'tiger'
-                gs.chain_active = True
-                gs.chain_src = dst
-            else:
-                gs.player = 'goat'
-                gs.chain_active = False
-                gs.chain_src = None
-        else:
-            return False
-    if rules.enable_ko:
-        key = tuple(gs.board)
-        gs.seen_counts[key] = gs.seen_counts.get(key, 0) + 1
-    return True
-
-def tiger_greedy(gs: GameState, rules: Rules):
-    b = gs.board; N = rules.N
-    if gs.chain_active and gs.chain_src is not None:
-        i = gs.chain_src
-        best = None; best_next = -1
-        for over, land in rules.JUMPS[i]:
-            if b[over]==GOAT and (over not in rules.safe_nodes) and b[land]==EMPTY:
-                nxt = 0
-                for o2, l2 in rules.JUMPS[land]:
-                    if b[o2]==GOAT and (o2 not in rules.safe_nodes) and b[l2]==EMPTY:
-                        nxt += 1
-                if nxt > best_next:
-                    best_next, best = nxt, ('jump', i, land)
-        return best
-    for i in range(N*N):
-        if b[i]==TIGER:
-            for over, land in rules.JUMPS[i]:
-                if b[over]==GOAT and (over not in rules.safe_nodes) and b[land]==EMPTY:
-                    return ('jump', i, land)
-    best = None; best_mob = -1
-    for i in range(N*N):
-        if b[i]==TIGER:
-            for d in rules.ADJ[i]:
-                if b[d]==EMPTY:
-                    b[i], b[d] = EMPTY, TIGER
-                    mob = 0
-                    for t in range(N*N):
-                        if b[t]==TIGER:
-                            mob += sum(1 for x in rules.ADJ[t] if b[x]==EMPTY)
-                            for over, land in rules.JUMPS[t]:
-                                if b[over]==GOAT and (over not in rules.safe_nodes) and b[land]==EMPTY:
-                                    mob += 1
-                    if mob > best_mob:
-                        best_mob, best = mob, ('move', i, d)
-                    b[i], b[d] = TIGER, EMPTY
-    return best
-
-def goat_greedy(gs: GameState, rules: Rules):
-    b = gs.board; N = rules.N
-    if phase(gs, rules)=='placement':
-        best = None; best_mob = 10**9
-        for dst in range(N*N):
-            if b[dst]==EMPTY:
-                danger = any(b[n]==TIGER for n in rules.ADJ[dst])
-                b[dst] = GOAT
-                mob = 0
-                for t in range(N*N):
-                    if b[t]==TIGER:
-                        mob += sum(1 for x in rules.ADJ[t] if b[x]==EMPTY)
-                        for over, land in rules.JUMPS[t]:
-                            if b[over]==GOAT and (over not in rules.safe_nodes) and b[land]==EMPTY:
-                                mob += 1
-                if danger:
-                    mob += 3
-                if mob < best_mob:
-                    best_mob, best = mob, ('place', dst)
-                b[dst] = EMPTY
-        return best
-    best = None; best_mob = 10**9
-    for g in range(N*N):
-        if b[g]==GOAT:
-            for d in rules.ADJ[g]:
-                if b[d]==EMPTY:
-                    b[g], b[d] = EMPTY, GOAT
-                    mob = 0
-                    for t in range(N*N):
-                        if b[t]==TIGER:
-                            mob += sum(1 for x in rules.ADJ[t] if b[x]==EMPTY)
-                            for over, land in rules.JUMPS[t]:
-                                if b[over]==GOAT and (over not in rules.safe_nodes) and b[land]==EMPTY:
-                                    mob += 1
-                    if mob < best_mob:
-                        best_mob, best = mob, ('move', g, d)
-                    b[g], b[d] = GOAT, EMPTY
-    return best
+from typing import List, Optional
+
+from core import (EMPTY, GOAT, TIGER, ROCK, MAX_PLIES, DIRS8, idx, rcOf, build_adj, build_jumps,
+                  edge_midpoint_sanctuaries, num_actions, action_to_index, index_to_action, Zobrist,
+                  zobrist_table, board_hash, Rules, make_rules, make_7x7_rules, make_5x5_rules, GameState,
+                  initial_state, position_key, record_position, phase, tiger_has_more_jumps_from, legal_actions,
+                  terminal_status, is_terminal, apply, apply_undo, undo, tiger_greedy, goat_greedy)
+from search import AlphaBeta
+from mcts import MCTS
+
+NODE_COLORS = {
+    EMPTY: ("#e5e7eb", "#4b5563"),
+    GOAT: ("#10b981", "#1f2937"),
+    TIGER: ("#fb923c", "#1f2937"),
+    ROCK: ("#9ca3af", "#374151"),
+}
 
 class BaghChal7x7GUI:
     def __init__(self, root):
@@ -321,6 +53,21 @@ class BaghChal7x7GUI:
         tk.Checkbutton(top, text="Multi-jump", variable=self.mj_var, command=self.on_param_change).pack(side="left", padx=(12,4))
         self.ko_var = tk.BooleanVar(value=self.rules.enable_ko)
         tk.Checkbutton(top, text="KO (threefold draw)", variable=self.ko_var, command=self.on_param_change).pack(side="left", padx=(6,4))
+        tk.Label(top, text="AI:").pack(side="left", padx=(12,4))
+        self.ai_var = tk.StringVar(value="greedy")
+        tk.OptionMenu(top, self.ai_var, "greedy", "search", "mcts").pack(side="left")
+        tk.Label(top, text="Seconds").pack(side="left", padx=(12,4))
+        self.ai_time_var = tk.DoubleVar(value=1.0)
+        tk.Spinbox(top, from_=0.1, to=30.0, increment=0.5, width=4, textvariable=self.ai_time_var).pack(side="left")
+        self.engine = None
+        self.ai_status: Optional[str] = None
+        # AI moves are computed on a worker thread and handed back through ai_queue.
+        # ai_gen tags every request so results for an abandoned game are dropped.
+        self.ai_queue: "queue.Queue" = queue.Queue()
+        self.ai_gen = 0
+        self.ai_stop: Optional[threading.Event] = None
+        self.ai_thinking = False
+        self.ai_ticks = 0
 
         self.size_px = 620
         self.padding = 32
@@ -329,15 +76,14 @@ class BaghChal7x7GUI:
         self.canvas.bind("<Button-1>", self.on_click)
 
         self.compute_points()
-        self.draw_board()
+        self.build_board()
         self.update_info()
-        self.root.after(50, self.maybe_ai_opening)
+        self.root.after(50, self.maybe_ai_opening, self.ai_gen)
 
     def on_param_change(self):
-        self.rules.goats_to_place = int(self.goats_var.get())
-        self.rules.capture_to_win = int(self.captures_var.get())
-        self.rules.enable_multijump = bool(self.mj_var.get())
-        self.rules.enable_ko = bool(self.ko_var.get())
+        self.rules = make_rules(self.rules.N, goats_to_place=int(self.goats_var.get()),
+                                capture_to_win=int(self.captures_var.get()),
+                                enable_multijump=bool(self.mj_var.get()), enable_ko=bool(self.ko_var.get()))
         self.on_new()
 
     def compute_points(self):
@@ -347,13 +93,15 @@ class BaghChal7x7GUI:
         self.points = [(self.padding + c*step, self.padding + r*step) for r in range(N) for c in range(N)]
 
     def on_new(self):
+        self.cancel_ai()
         self.state = initial_state(self.rules)
+        self.engine = None
         self.selected = None
         self.legal_dest = []
         self.compute_points()
         self.update_info()
-        self.draw_board()
-        self.root.after(50, self.maybe_ai_opening)
+        self.build_board()
+        self.root.after(50, self.maybe_ai_opening, self.ai_gen)
 
     def on_side_change(self, _=None):
         self.human_role = self.side_var.get()
@@ -374,7 +122,9 @@ class BaghChal7x7GUI:
             txt += f"\n{status}"
         self.info.config(text=txt)
 
-    def draw_board(self):
+    def build_board(self):
+        # Static layer (lines, sanctuaries, labels) plus one set of items per node;
+        # draw_board afterwards only reconfigures nodes whose look changed.
         self.canvas.delete("all")
         ADJ = self.rules.ADJ
         for i, nbrs in enumerate(ADJ):
@@ -387,25 +137,38 @@ class BaghChal7x7GUI:
             x,y = self.points[i]
             r = max(12, int(self.step*0.25))
             self.canvas.create_oval(x-r,y-r,x+r,y+r, outline="#8b5cf6", width=3, dash=(4,3))
-        r_sel = self.selected
         radius = max(9, int(self.step*0.22))
         hlrad  = max(13, int(self.step*0.27))
+        self.node_items = []
         for i,(x,y) in enumerate(self.points):
-            if i in self.legal_dest:
-                self.canvas.create_oval(x-hlrad,y-hlrad,x+hlrad,y+hlrad, fill="#dbeafe", outline="#2563eb", width=3)
-            v = self.state.board[i]
-            if v==TIGER:
-                fill, outline = "#fb923c", "#1f2937"
-            elif v==GOAT:
-                fill, outline = "#10b981", "#1f2937"
-            elif v==ROCK:
-                fill, outline = "#9ca3af", "#374151"
-            else:
-                fill, outline = "#e5e7eb", "#4b5563"
-            self.canvas.create_oval(x-radius,y-radius,x+radius,y+radius, fill=fill, outline=outline, width=2)
-            if r_sel==i:
-                self.canvas.create_oval(x-hlrad,y-hlrad,x+hlrad,y+hlrad, outline="#0ea5e9", width=3)
+            hl = self.canvas.create_oval(x-hlrad,y-hlrad,x+hlrad,y+hlrad, fill="#dbeafe", outline="#2563eb", width=3,
+                                         state="hidden")
+            piece = self.canvas.create_oval(x-radius,y-radius,x+radius,y+radius, width=2)
+            sel = self.canvas.create_oval(x-hlrad,y-hlrad,x+hlrad,y+hlrad, outline="#0ea5e9", width=3, state="hidden")
             self.canvas.create_text(x, y+1, text=str(i), fill="#374151", font=("Arial", max(8, int(self.step*0.18))))
+            self.node_items.append((hl, piece, sel))
+        self.drawn = [None]*len(self.points)
+        self.draw_board()
+
+    def draw_board(self):
+        dests = set(self.legal_dest)
+        board = self.state.board
+        drawn = self.drawn
+        cfg = self.canvas.itemconfigure
+        for i, v in enumerate(board):
+            look = (v, i in dests, i == self.selected)
+            old = drawn[i]
+            if look == old:
+                continue
+            hl, piece, sel = self.node_items[i]
+            if old is None or old[0] != v:
+                fill, outline = NODE_COLORS[v]
+                cfg(piece, fill=fill, outline=outline)
+            if old is None or old[1] != look[1]:
+                cfg(hl, state="normal" if look[1] else "hidden")
+            if old is None or old[2] != look[2]:
+                cfg(sel, state="normal" if look[2] else "hidden")
+            drawn[i] = look
 
     def on_click(self, event):
         if self.state.player != self.human_role:
@@ -484,10 +247,15 @@ class BaghChal7x7GUI:
         return dests
 
     def pick_node(self, x, y) -> Optional[int]:
-        rad2 = (max(9, int(self.step*0.22)) + 6)**2
-        for i,(px,py) in enumerate(self.points):
-            if (x-px)**2 + (y-py)**2 <= rad2:
-                return i
+        N = self.rules.N
+        c = round((x - self.padding) / self.step)
+        r = round((y - self.padding) / self.step)
+        if not (0 <= r < N and 0 <= c < N):
+            return None
+        i = idx(r, c, N)
+        px, py = self.points[i]
+        if (x-px)**2 + (y-py)**2 <= (max(9, int(self.step*0.22)) + 6)**2:
+            return i
         return None
 
     def after_human_move(self):
@@ -497,38 +265,86 @@ class BaghChal7x7GUI:
         if term:
             self.end_game(winner)
             return
-        self.root.after(280, self.ai_move)
-
-    def ai_move(self):
-        if self.state.player != self.ai_role:
+        self.root.after(280, self.ai_move, self.ai_gen)
+
+    def cancel_ai(self):
+        self.ai_gen += 1
+        if self.ai_stop is not None:
+            self.ai_stop.set()
+        self.ai_stop = None
+        self.ai_thinking = False
+        self.canvas.config(cursor="")
+
+    def ai_move(self, gen: Optional[int]=None):
+        if gen is not None and gen != self.ai_gen:
+            return
+        if self.ai_thinking or self.state.player != self.ai_role or is_terminal(self.state, self.rules)[0]:
             return
-        while self.state.player == self.ai_role:
-            if self.ai_role=='tiger':
-                act = tiger_greedy(self.state, self.rules)
+        kind = self.ai_var.get()
+        engine = None
+        if kind in ('search', 'mcts'):
+            engine_cls = AlphaBeta if kind == 'search' else MCTS
+            if not isinstance(self.engine, engine_cls) or self.engine.rules is not self.rules:
+                self.engine = engine_cls(self.rules)
+            engine = self.engine
+        try:
+            budget = max(0.05, float(self.ai_time_var.get()))
+        except (tk.TclError, ValueError):
+            budget = 1.0
+        # The worker only ever sees its own copy of the position.
+        gs = replace(self.state, board=self.state.board[:], seen_counts=dict(self.state.seen_counts),
+                     seen_boards=dict(self.state.seen_boards) if self.state.seen_boards is not None else None)
+        self.ai_thinking = True
+        self.ai_stop = threading.Event()
+        self.ai_ticks = 0
+        self.canvas.config(cursor="watch")
+        threading.Thread(target=self.ai_worker, daemon=True,
+                         args=(self.ai_gen, kind, engine, gs, self.rules, budget, self.ai_stop)).start()
+        self.root.after(40, self.poll_ai, self.ai_gen)
+
+    def ai_worker(self, gen: int, kind: str, engine, gs: GameState, rules: Rules, budget: float, stop):
+        # Runs off the Tk thread: no widget access here, only the queue.
+        try:
+            if engine is not None:
+                act = engine.choose(gs, time_limit=budget, stop=stop)
+                status = f"AI {kind}: {engine.stats.summary()}"
             else:
-                act = goat_greedy(self.state, self.rules)
-            if act is None:
-                break
+                act = tiger_greedy(gs, rules) if gs.player=='tiger' else goat_greedy(gs, rules)
+                status = None
+        except Exception as e:
+            act, status = None, f"AI error: {e}"
+        self.ai_queue.put((gen, act, status))
+
+    def poll_ai(self, gen: int):
+        if gen != self.ai_gen or not self.ai_thinking:
+            return
+        while True:
+            try:
+                got, act, status = self.ai_queue.get_nowait()
+            except queue.Empty:
+                self.ai_ticks += 1
+                self.update_info(f"AI ({self.ai_var.get()}) thinking" + "."*(self.ai_ticks//6 % 4))
+                self.root.after(40, self.poll_ai, gen)
+                return
+            if got == gen:
+                break  # anything else is left over from a cancelled game
+        self.ai_thinking = False
+        self.ai_stop = None
+        self.ai_status = status
+        self.canvas.config(cursor="")
+        if act is not None:
             apply(self.state, self.rules, act)
-            if self.ai_role == 'goat':
-                break
-            if act[0] != 'jump' and self.state.chain_active:
-                break
-            if act[0] == 'move':
-                break
-        self.update_info()
+        self.update_info(self.ai_status)
         self.draw_board()
         term, winner = is_terminal(self.state, self.rules)
         if term:
             self.end_game(winner)
+        elif act is not None and self.state.player == self.ai_role:
+            self.ai_move(gen)  # tiger continues a jump chain
 
-    def maybe_ai_opening(self):
-        if self.ai_role=='goat' and self.state.player=='goat' and phase(self.state, self.rules)=='placement':
-            act = goat_greedy(self.state, self.rules)
-            if act:
-                apply(self.state, self.rules, act)
-            self.update_info()
-            self.draw_board()
+    def maybe_ai_opening(self, gen: Optional[int]=None):
+        if self.state.player == self.ai_role:
+            self.ai_move(gen)
 
     def end_game(self, winner):
         message = "Draw (KO or move cap)." if winner=='draw' else f"{winner.upper()} wins!"
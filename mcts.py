@@ -0,0 +1,213 @@
+import math
+import multiprocessing as mp
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from core import (Rules, GameState, legal_actions, apply_undo, undo, terminal_status, position_key_with_counts,
+                  tiger_greedy, goat_greedy)
+
+class Node:
+    __slots__ = ('parent', 'action', 'mover', 'player', 'key', 'children', 'untried', 'N', 'W', 'winner')
+
+    def __init__(self, parent: Optional['Node'], action, mover: Optional[str], gs: GameState, rules: Rules):
+        self.parent = parent
+        self.action = action
+        self.mover = mover
+        self.player = gs.player
+        self.key = node_key(gs, rules)
+        self.children: Dict[tuple, 'Node'] = {}
+        self.winner, _ = terminal_status(gs, rules)
+        self.untried: List[tuple] = [] if self.winner is not None else legal_actions(gs, rules)
+        self.N = 0
+        self.W = 0.0
+
+def node_key(gs: GameState, rules: Rules) -> int:
+    return position_key_with_counts(gs, rules)
+
+@dataclass
+class MCTSStats:
+    iterations: int = 0
+    playouts: int = 0
+    elapsed: float = 0.0
+    reused: int = 0
+
+    @property
+    def playouts_per_sec(self) -> float:
+        return self.playouts / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        return (f"{self.iterations} iterations  {self.playouts_per_sec:,.0f} playouts/s  "
+                f"reused {self.reused} visits")
+
+def _rollout_action(gs: GameState, rules: Rules, policy: str, rng: random.Random):
+    if policy == 'greedy':
+        return tiger_greedy(gs, rules) if gs.player == 'tiger' else goat_greedy(gs, rules)
+    acts = legal_actions(gs, rules)
+    return acts[rng.randrange(len(acts))] if acts else None
+
+class MCTS:
+    # UCT over apply_undo/undo. A tiger chain jump is just a child whose player
+    # is still 'tiger'; values are always scored for the side that made the move.
+    def __init__(self, rules: Rules, playout: str = 'random', c: float = 1.4, max_rollout: int = 200,
+                 workers: int = 1, seed: Optional[int] = None):
+        if playout not in ('random', 'greedy'):
+            raise ValueError(f"unknown playout policy {playout!r}")
+        self.rules = rules
+        self.playout = playout
+        self.c = c
+        self.max_rollout = max_rollout
+        self.workers = workers
+        self.rng = random.Random(seed)
+        self.root: Optional[Node] = None
+        self.stats = MCTSStats()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+
+    def choose(self, gs: GameState, iterations: Optional[int] = None, time_limit: Optional[float] = None, stop=None):
+        if iterations is None and time_limit is None:
+            iterations = 1000
+        self.stats = MCTSStats()
+        t0 = time.perf_counter()
+        if self.workers > 1:
+            visits = self._parallel(gs, iterations, time_limit, stop)
+        else:
+            root = self._reuse_root(gs)
+            self._run(root, gs, iterations, time_limit, stop)
+            visits = {a: ch.N for a, ch in root.children.items()}
+        self.stats.elapsed = time.perf_counter() - t0
+        if not visits:
+            acts = legal_actions(gs, self.rules)
+            return acts[0] if acts else None
+        return max(visits, key=visits.get)
+
+    def _reuse_root(self, gs: GameState) -> Node:
+        key = node_key(gs, self.rules)
+        found = None
+        if self.root is not None:
+            frontier = [self.root]
+            for _ in range(4):
+                nxt = []
+                for node in frontier:
+                    if node.key == key and node.player == gs.player:
+                        found = node
+                        break
+                    nxt.extend(node.children.values())
+                if found is not None or not nxt:
+                    break
+                frontier = nxt
+        if found is None:
+            found = Node(None, None, None, gs, self.rules)
+        else:
+            self.stats.reused = found.N
+        found.parent = None
+        self.root = found
+        return found
+
+    def _run(self, root: Node, gs: GameState, iterations: Optional[int], time_limit: Optional[float], stop=None):
+        rules = self.rules
+        deadline = time.perf_counter() + time_limit if time_limit is not None else None
+        st = self.stats
+        rng = self.rng
+        c = self.c
+        while True:
+            if iterations is not None and st.iterations >= iterations:
+                break
+            if deadline is not None and not st.iterations & 15 and time.perf_counter() > deadline:
+                break
+            if stop is not None and not st.iterations & 15 and stop.is_set():
+                break
+            node = root
+            recs = []
+            # selection
+            while not node.untried and node.children and node.winner is None:
+                lnN = math.log(node.N)
+                best, best_u = None, -1.0
+                for ch in node.children.values():
+                    u = ch.W / ch.N + c*math.sqrt(lnN / ch.N)
+                    if u > best_u:
+                        best, best_u = ch, u
+                node = best
+                recs.append(apply_undo(gs, rules, node.action))
+            # expansion
+            if node.untried and node.winner is None:
+                a = node.untried.pop(rng.randrange(len(node.untried)))
+                mover = gs.player
+                recs.append(apply_undo(gs, rules, a))
+                child = Node(node, a, mover, gs, rules)
+                node.children[a] = child
+                node = child
+            # simulation
+            winner = node.winner
+            depth = 0
+            while winner is None:
+                if depth >= self.max_rollout:
+                    winner = 'draw'
+                    break
+                a = _rollout_action(gs, rules, self.playout, rng)
+                if a is None:
+                    winner = 'draw'
+                    break
+                recs.append(apply_undo(gs, rules, a))
+                depth += 1
+                winner, _ = terminal_status(gs, rules)
+            for rec in reversed(recs):
+                undo(gs, rules, rec)
+            st.playouts += 1
+            st.iterations += 1
+            # backpropagation
+            while node is not None:
+                node.N += 1
+                if winner == 'draw':
+                    node.W += 0.5
+                elif winner == node.mover:
+                    node.W += 1.0
+                node = node.parent
+
+    def _parallel(self, gs: GameState, iterations: Optional[int], time_limit: Optional[float],
+                  stop=None) -> Dict[tuple, int]:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers)
+        per = None if iterations is None else max(1, iterations // self.workers)
+        cfg = (self.playout, self.c, self.max_rollout)
+        # The caller's stop event cannot cross processes; workers watch a
+        # manager event that is set once stop is seen here.
+        shared = None
+        if stop is not None:
+            if self._manager is None:
+                self._manager = mp.Manager()
+            shared = self._manager.Event()
+        futs = [self._pool.submit(_root_search, gs, self.rules, cfg, per, time_limit, self.rng.getrandbits(32), shared)
+                for _ in range(self.workers)]
+        if shared is not None:
+            pending = set(futs)
+            while pending:
+                if stop.is_set():
+                    shared.set()
+                    break
+                _, pending = wait(pending, timeout=0.05)
+        visits: Dict[tuple, int] = {}
+        for f in futs:
+            counts, n = f.result()
+            self.stats.iterations += n
+            self.stats.playouts += n
+            for a, v in counts.items():
+                visits[a] = visits.get(a, 0) + v
+        return visits
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+
+def _root_search(gs: GameState, rules: Rules, cfg, iterations, time_limit, seed, stop=None):
+    playout, c, max_rollout = cfg
+    m = MCTS(rules, playout=playout, c=c, max_rollout=max_rollout, seed=seed)
+    root = m._reuse_root(gs)
+    m._run(root, gs, iterations, time_limit, stop)
+    return {a: ch.N for a, ch in root.children.items()}, m.stats.iterations
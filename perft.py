@@ -0,0 +1,171 @@
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from dataclasses import replace
+from typing import Dict, List, Optional
+
+from core import (EMPTY, GOAT, TIGER, ROCK, Rules, GameState, make_rules, initial_state, refresh_status, legal_actions,
+                  apply, apply_undo, undo, is_terminal)
+from compact import CompactRules, to_compact, c_legal_actions, c_apply, c_is_terminal
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'perft_fixtures.json')
+OPTIONS = {'mj+ko': (True, True), 'mj': (True, False), 'ko': (False, True), 'plain': (False, False)}
+_PIECES = {'.': EMPTY, 'G': GOAT, 'T': TIGER, 'R': ROCK}
+
+# Hand-built positions on the 7x7 board. Each may name a move whose resulting
+# board is pre-seeded twice in the repetition table, so KO fires one ply in.
+POSITIONS = {
+    'initial': None,
+    'chain': dict(player='tiger', goats_placed=30, goats_captured=2, rows=(
+        'T.....T',
+        '.G.....',
+        '.......',
+        '.G.G...',
+        '.......',
+        '.G.....',
+        'T.....T')),
+    'sanctuary': dict(player='tiger', goats_placed=30, goats_captured=0, rows=(
+        'TGG.GGT',
+        'GG...GG',
+        '.......',
+        'G.....G',
+        '.......',
+        'GG...GG',
+        'TGG.GGT')),
+    'last_placement': dict(player='goat', goats_placed=29, goats_captured=1, rows=(
+        'T.GGG.T',
+        '.GG.GG.',
+        'GG...GG',
+        'G.GGG.G',
+        'GG...GG',
+        '.GG.GG.',
+        'T.G.G.T')),
+    'ko': dict(player='goat', goats_placed=30, goats_captured=4, ko_after=('move', 9, 16), rows=(
+        'T.G.G.T',
+        '..G....',
+        '.......',
+        '...G...',
+        '..GGG..',
+        '.......',
+        'T..G..T')),
+    'cornered': dict(player='goat', goats_placed=30, goats_captured=0, rows=(
+        'TG.GG.T',
+        'GG.G.GG',
+        'G.G.G.G',
+        'GG.G.GG',
+        'G.G.G.G',
+        'GG.G.GG',
+        'T..G..T')),
+}
+
+def build_position(name: str, rules: Rules) -> GameState:
+    spec = POSITIONS[name]
+    if spec is None:
+        return initial_state(rules)
+    board = [_PIECES[ch] for row in spec['rows'] for ch in row]
+    gs = refresh_status(GameState(board=board, goats_placed=spec['goats_placed'],
+                                  goats_captured=spec['goats_captured'], player=spec['player'], move_count=0), rules)
+    gs.seen_counts[gs.zkey] = 1
+    if 'ko_after' in spec:
+        probe = replace(gs, board=board[:], seen_counts={})
+        if not apply(probe, rules, spec['ko_after']):
+            raise ValueError(f"ko_after move of {name!r} is illegal")
+        gs.seen_counts[probe.zkey] = 2
+    return gs
+
+def perft_core(gs: GameState, rules: Rules, depth: int) -> int:
+    if depth == 0 or is_terminal(gs, rules)[0]:
+        return 1
+    n = 0
+    for a in legal_actions(gs, rules):
+        rec = apply_undo(gs, rules, a)
+        n += perft_core(gs, rules, depth-1)
+        undo(gs, rules, rec)
+    return n
+
+def perft_compact(cs, cr, depth: int) -> int:
+    if depth == 0 or c_is_terminal(cs, cr)[0]:
+        return 1
+    n = 0
+    for code in c_legal_actions(cs, cr):
+        child = cs.copy()
+        c_apply(child, cr, code)
+        n += perft_compact(child, cr, depth-1)
+    return n
+
+BACKENDS = {
+    'core': lambda gs, rules: (perft_core, gs, rules),
+    'compact': lambda gs, rules: (perft_compact, to_compact(gs), CompactRules(rules)),
+}
+
+def run_perft(position: str, option: str, depth: int, backend: str = 'core', memory: bool = False):
+    mj, ko = OPTIONS[option]
+    rules = make_rules(7, enable_multijump=mj, enable_ko=ko)
+    fn, state, tables = BACKENDS[backend](build_position(position, rules), rules)
+    t0 = time.perf_counter()
+    count = fn(state, tables, depth)
+    dt = time.perf_counter() - t0
+    peak = 0
+    if memory:
+        tracemalloc.start()
+        fn(state, tables, depth)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return count, dt, peak
+
+def load_fixtures(path: str = FIXTURES) -> List[Dict]:
+    with open(path) as f:
+        return json.load(f)
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Perft move-generation counts and speed for every engine backend.")
+    ap.add_argument('--backend', action='append', choices=sorted(BACKENDS), help="default: all backends")
+    ap.add_argument('--position', action='append', choices=sorted(POSITIONS), help="default: all fixtures")
+    ap.add_argument('--depth', type=int, help="run to this depth instead of checking the fixtures")
+    ap.add_argument('--option', action='append', choices=sorted(OPTIONS))
+    ap.add_argument('--memory', action='store_true', help="also report peak traced memory (runs twice)")
+    ap.add_argument('--regen', action='store_true', help="rewrite the fixture counts from the core backend")
+    args = ap.parse_args(argv)
+    backends = args.backend or list(BACKENDS)
+
+    if args.regen:
+        fixtures = load_fixtures()
+        for fx in fixtures:
+            fx['nodes'] = run_perft(fx['position'], fx['option'], fx['depth'])[0]
+        with open(FIXTURES, 'w') as f:
+            json.dump(fixtures, f, indent=1)
+            f.write("\n")
+        print(f"rewrote {len(fixtures)} fixtures")
+        return 0
+
+    if args.depth is not None:
+        cases = [{'position': p, 'option': o, 'depth': args.depth, 'nodes': None}
+                 for p in (args.position or list(POSITIONS)) for o in (args.option or list(OPTIONS))]
+    else:
+        cases = [fx for fx in load_fixtures()
+                 if (not args.position or fx['position'] in args.position)
+                 and (not args.option or fx['option'] in args.option)]
+    failed = 0
+    totals = {b: [0, 0.0, 0] for b in backends}
+    print(f"{'position':<15}{'option':<7}{'d':>2}  {'backend':<9}{'nodes':>10}{'nodes/s':>12}{'peak KB':>9}")
+    for fx in cases:
+        for b in backends:
+            count, dt, peak = run_perft(fx['position'], fx['option'], fx['depth'], b, args.memory)
+            ok = fx['nodes'] is None or count == fx['nodes']
+            failed += not ok
+            t = totals[b]
+            t[0] += count; t[1] += dt; t[2] = max(t[2], peak)
+            print(f"{fx['position']:<15}{fx['option']:<7}{fx['depth']:>2}  {b:<9}{count:>10}"
+                  f"{count/dt if dt else 0:>12,.0f}{peak/1024:>9.0f}" + ("" if ok else f"  MISMATCH, expected {fx['nodes']}"))
+    for b, (n, dt, peak) in totals.items():
+        print(f"total {b:<9}{n:>10} nodes  {n/dt if dt else 0:,.0f} nodes/s  peak {peak/1024:.0f} KB")
+    if failed:
+        print(f"{failed} perft mismatches", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,327 @@
+import argparse
+import heapq
+import multiprocessing as mp
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from core import (Rules, GameState, make_rules, initial_state, apply, position_key_with_counts, index_to_action,
+                  action_to_index)
+from records import WINNERS, read_header, chunk_offsets, read_chunks
+
+# Per-(position, action) outcome counts over a game collection. Every ply of
+# every game adds one to the row of the position before the move and the move
+# played, split by the game's winner; position totals are the sum of its rows.
+#
+# Index file: header, then the rows sorted by (key, action) as three columns
+#   keys u64[n] | counts u32[n, 4] (visits, goat, tiger, draw) | actions u16[n]
+# so the key column maps as one contiguous array for searchsorted. Runs spilled
+# while building hold the same sorted rows, one _ROW record each.
+MAGIC = b'BCPI'
+VERSION = 1
+_HEADER = struct.Struct('<4sHBBBBBBxxxxQ')   # magic, version, N, goats, captures, multijump, ko, sanctuaries, rows
+_ROW = struct.Struct('<QHIIII')
+_BLOCK = 4096
+_FAN_IN = 128        # runs merged at once; more are merged in passes
+
+def stats_key(gs: GameState, rules: Rules) -> int:
+    # Board, side to move and chain square via the zobrist key, plus the
+    # placement count, which separates positions that differ only in goats in hand.
+    return position_key_with_counts(gs, rules)
+
+@dataclass
+class ActionStats:
+    action: Tuple
+    visits: int
+    goat_wins: int
+    tiger_wins: int
+    draws: int
+
+    def score(self, role: str) -> float:
+        # Mean result for role, counting wins 1 and draws 1/2.
+        wins = self.tiger_wins if role == 'tiger' else self.goat_wins
+        return (wins + 0.5*self.draws) / self.visits if self.visits else 0.0
+
+@dataclass
+class PositionStats:
+    visits: int
+    goat_wins: int
+    tiger_wins: int
+    draws: int
+    actions: List[ActionStats]
+
+    def best(self, role: str, min_visits: int = 1) -> Optional[ActionStats]:
+        cands = [a for a in self.actions if a.visits >= min_visits]
+        return max(cands, key=lambda a: (a.score(role), a.visits)) if cands else None
+
+# ---- building ----
+
+def _spill(acc: Dict[int, List[int]], path: str):
+    with open(path, 'wb') as f:
+        pack = _ROW.pack
+        for ka in sorted(acc):
+            n, g, t, d = acc[ka]
+            f.write(pack(ka >> 16, ka & 0xFFFF, n, g, t, d))
+
+def _index_shard(job) -> Tuple[List[str], int, int]:
+    # Replays the games of some chunks, spilling a sorted run every time the
+    # table reaches run_entries rows. Returns run paths, games and plies.
+    path, offsets, tmpdir, shard, run_entries = job
+    rules, _ = read_header(path)
+    N = rules.N
+    actions_of = [index_to_action(i, N) for i in range(17*N*N)]
+    acc: Dict[int, List[int]] = {}
+    runs: List[str] = []
+    games = plies = 0
+    for rec in read_chunks(path, offsets):
+        col = 1 + WINNERS.index(rec.winner) if rec.winner in ('goat', 'tiger', 'draw') else 0
+        gs = initial_state(rules)
+        for i, a in enumerate(rec.actions):
+            ka = position_key_with_counts(gs, rules) << 16 | a
+            row = acc.get(ka)
+            if row is None:
+                row = acc[ka] = [0, 0, 0, 0]
+            row[0] += 1
+            if col:
+                row[col] += 1
+            act = actions_of[a]
+            if act is None or not apply(gs, rules, act):
+                raise ValueError(f"{path}: illegal action {act} at ply {i}")
+        games += 1
+        plies += len(rec.actions)
+        if len(acc) >= run_entries:
+            runs.append(os.path.join(tmpdir, f"run-{shard}-{len(runs)}"))
+            _spill(acc, runs[-1])
+            acc.clear()
+    if acc:
+        runs.append(os.path.join(tmpdir, f"run-{shard}-{len(runs)}"))
+        _spill(acc, runs[-1])
+    return runs, games, plies
+
+def _combine(streams: List[Iterable]) -> Iterator[Tuple[int, int, List[int]]]:
+    # k-way merge of sorted row streams, summing equal (key, action) rows.
+    cur = None
+    for row in heapq.merge(*streams):
+        if cur is not None and row[0] == cur[0] and row[1] == cur[1]:
+            c = cur[2]
+            c[0] += row[2]; c[1] += row[3]; c[2] += row[4]; c[3] += row[5]
+            continue
+        if cur is not None:
+            yield cur
+        cur = (row[0], row[1], list(row[2:]))
+    if cur is not None:
+        yield cur
+
+def _merge_runs(runs: List[str], tmpdir: str) -> List[str]:
+    # Pre-merges runs in groups until at most _FAN_IN remain, which bounds
+    # open files and merge buffers for any corpus size.
+    level = 0
+    while len(runs) > _FAN_IN:
+        merged = []
+        for i in range(0, len(runs), _FAN_IN):
+            group = runs[i:i + _FAN_IN]
+            path = os.path.join(tmpdir, f"merge-{level}-{len(merged)}")
+            with open(path, 'wb') as f:
+                pack = _ROW.pack
+                for k, a, c in _combine([_read_run(r) for r in group]):
+                    f.write(pack(k, a, *c))
+            for r in group:
+                os.remove(r)
+            merged.append(path)
+        runs, level = merged, level + 1
+    return runs
+
+def _read_run(path: str) -> Iterator[Tuple[int, int, int, int, int, int]]:
+    size = _ROW.size
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(size*_BLOCK)
+            if not data:
+                return
+            yield from _ROW.iter_unpack(data)
+
+def _read_index_rows(path: str) -> Iterator[Tuple[int, int, int, int, int, int]]:
+    idx = PositionIndex(path)
+    try:
+        for lo in range(0, idx.rows, _BLOCK):
+            hi = min(idx.rows, lo + _BLOCK)
+            keys, acts, counts = idx.keys[lo:hi].tolist(), idx.actions[lo:hi].tolist(), idx.counts[lo:hi].tolist()
+            for k, a, c in zip(keys, acts, counts):
+                yield (k, a, *c)
+    finally:
+        idx.close()
+
+def _write_merged(out: str, rules: Rules, streams: List[Iterable]) -> int:
+    # Columns go to side files first since the row count is not known yet.
+    parts = [out + suffix for suffix in ('.keys', '.counts', '.actions')]
+    files = [open(p, 'wb') for p in parts]
+    n = 0
+    keys, counts, acts = [], [], []
+
+    def flush():
+        files[0].write(np.asarray(keys, np.uint64).tobytes())
+        files[1].write(np.asarray(counts, np.uint32).tobytes())
+        files[2].write(np.asarray(acts, np.uint16).tobytes())
+        keys.clear(); counts.clear(); acts.clear()
+
+    try:
+        for k, a, c in _combine(streams):
+            keys.append(k); acts.append(a); counts.append(c)
+            n += 1
+            if len(keys) >= _BLOCK:
+                flush()
+        if keys:
+            flush()
+    finally:
+        for f in files:
+            f.close()
+    with open(out, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, *rules.options(), n))
+        for p in parts:
+            with open(p, 'rb') as src:
+                shutil.copyfileobj(src, f, 1 << 20)
+            os.remove(p)
+    return n
+
+def build_index(paths: List[str], out: str, workers: int = 1, run_entries: int = 1 << 20,
+                chunks_per_job: int = 8) -> Dict[str, int]:
+    # Shards the chunks of all record files across workers, then merges their
+    # spilled runs. Peak memory is about workers * run_entries table rows.
+    rules = None
+    jobs = []
+    tmpdir = tempfile.mkdtemp(prefix='posindex-', dir=os.path.dirname(os.path.abspath(out)))
+    try:
+        for path in paths:
+            r, _ = read_header(path)
+            if rules is None:
+                rules = r
+            elif r.options() != rules.options():
+                raise ValueError(f"{path} holds records for different rules")
+            offs = [o for o, _ in chunk_offsets(path)]
+            for i in range(0, len(offs), chunks_per_job):
+                jobs.append((path, offs[i:i + chunks_per_job], tmpdir, len(jobs), run_entries))
+        if rules is None:
+            raise ValueError("no record files given")
+        if workers > 1:
+            with mp.Pool(workers) as pool:
+                results = pool.map(_index_shard, jobs, chunksize=1)
+        else:
+            results = [_index_shard(j) for j in jobs]
+        runs = [r for rs, _, _ in results for r in rs]
+        rows = _write_merged(out, rules, [_read_run(r) for r in _merge_runs(runs, tmpdir)])
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    return {'games': sum(g for _, g, _ in results), 'plies': sum(p for _, _, p in results), 'runs': len(runs),
+            'rows': rows}
+
+def merge_indexes(paths: List[str], out: str) -> int:
+    # Combines indexes built separately (e.g. per machine or per day).
+    rules = None
+    for path in paths:
+        r = PositionIndex(path)
+        opts = r.rules.options()
+        r.close()
+        if rules is None:
+            rules = make_rules(*opts)
+        elif opts != rules.options():
+            raise ValueError(f"{path} was built for different rules")
+    return _write_merged(out, rules, [_read_index_rows(p) for p in paths])
+
+# ---- querying ----
+
+class PositionIndex:
+    # Read-only mmap view; a lookup is a searchsorted over the key column.
+    def __init__(self, path: str, rules: Optional[Rules] = None):
+        with open(path, 'rb') as f:
+            head = f.read(_HEADER.size)
+        if len(head) < _HEADER.size:
+            raise ValueError(f"{path} is not a position index")
+        magic, version, *options, rows = _HEADER.unpack(head)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a position index")
+        if rules is not None and tuple(options) != tuple(int(x) for x in rules.options()):
+            raise ValueError(f"{path} was built for different rules {tuple(options)}")
+        self.rules = rules or make_rules(*options)
+        self.rows = rows
+        if rows:
+            mm = np.memmap(path, np.uint8, 'r')
+            base = _HEADER.size
+            self._mm = mm
+            self.keys = mm[base:base + 8*rows].view(np.uint64)
+            self.counts = mm[base + 8*rows:base + 24*rows].view(np.uint32).reshape(rows, 4)
+            self.actions = mm[base + 24*rows:base + 26*rows].view(np.uint16)
+        else:
+            self._mm = None
+            self.keys = np.zeros(0, np.uint64)
+            self.counts = np.zeros((0, 4), np.uint32)
+            self.actions = np.zeros(0, np.uint16)
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def lookup_key(self, key: int) -> Optional[PositionStats]:
+        k = np.uint64(key)
+        lo = int(self.keys.searchsorted(k, 'left'))
+        if lo == self.rows or int(self.keys[lo]) != key:
+            return None
+        hi = int(self.keys.searchsorted(k, 'right'))
+        counts = self.counts[lo:hi].tolist()
+        N = self.rules.N
+        acts = [ActionStats(index_to_action(a, N), *c) for a, c in zip(self.actions[lo:hi].tolist(), counts)]
+        n, g, t, d = (sum(col) for col in zip(*counts))
+        return PositionStats(n, g, t, d, acts)
+
+    def lookup(self, gs: GameState) -> Optional[PositionStats]:
+        return self.lookup_key(stats_key(gs, self.rules))
+
+    def close(self):
+        self._mm = None
+        self.keys = self.counts = self.actions = None
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Build or query a position statistics index over game records.")
+    ap.add_argument('inputs', nargs='+', help="record files to index, or index files with --merge")
+    ap.add_argument('--out', default='positions.pidx')
+    ap.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    ap.add_argument('--run-entries', type=int, default=1 << 20, help="table rows per worker before spilling a run")
+    ap.add_argument('--merge', action='store_true', help="merge existing index files into --out")
+    ap.add_argument('--query', metavar='ACTIONS',
+                    help="print the stats of the position after these comma-separated action indices in INPUTS[0]")
+    args = ap.parse_args(argv)
+
+    if args.query is not None:
+        idx = PositionIndex(args.inputs[0])
+        gs = initial_state(idx.rules)
+        for a in filter(None, args.query.split(',')):
+            if not apply(gs, idx.rules, index_to_action(int(a), idx.rules.N)):
+                sys.exit(f"illegal action {a}")
+        st = idx.lookup(gs)
+        if st is None:
+            print("position not in index")
+            return
+        print(f"visits {st.visits}  goat {st.goat_wins}  tiger {st.tiger_wins}  draw {st.draws}")
+        for a in sorted(st.actions, key=lambda a: -a.visits):
+            print(f"  {action_to_index(a.action, idx.rules.N):5d} {str(a.action):18s} visits {a.visits:8d}  "
+                  f"score {a.score(gs.player):.3f}")
+        return
+
+    t0 = time.perf_counter()
+    if args.merge:
+        rows = merge_indexes(args.inputs, args.out)
+        print(f"merged {len(args.inputs)} indexes into {rows} rows in {time.perf_counter() - t0:.1f}s",
+              file=sys.stderr)
+        return
+    info = build_index(args.inputs, args.out, max(1, args.workers), args.run_entries)
+    dt = time.perf_counter() - t0
+    print(f"indexed {info['games']} games / {info['plies']} plies ({info['plies']/dt:,.0f} plies/s) into "
+          f"{info['rows']} rows from {info['runs']} runs in {dt:.1f}s", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
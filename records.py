@@ -0,0 +1,236 @@
+import numbers
+import os
+import struct
+import zlib
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple
+
+from core import Rules, GameState, make_rules, initial_state, apply, action_to_index, index_to_action, num_actions
+
+# A record file is a header followed by self-contained chunks:
+#   header: magic, version, rules options, compression flag
+#   chunk:  stored length, raw length, game count, then the (maybe zlib) payload
+#   game:   varint ply count, varint action index per ply, result byte
+# Action indices stay below 17*N*N, so a ply costs one or two bytes up to 11x11.
+MAGIC = b'BCGR'
+VERSION = 1
+_HEADER = struct.Struct('<4sHBBBBBBB')   # magic, version, N, goats, captures, multijump, ko, sanctuaries, zlib
+_CHUNK = struct.Struct('<III')
+WINNERS = ('goat', 'tiger', 'draw', None)
+REASONS = (None, 'ko', 'capture', 'blocked', 'move_cap', 'no_move')
+
+@dataclass
+class GameRecord:
+    actions: List[int]
+    winner: Optional[str]
+    reason: Optional[str] = None
+
+def _varint(n: int) -> bytes:
+    out = bytearray()
+    while n >= 0x80:
+        out.append(n & 0x7F | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+def encode_game(actions: List[int], winner: Optional[str], reason: Optional[str] = None, table=None) -> bytes:
+    body = b''.join(map(_varint, actions)) if table is None else b''.join([table[a] for a in actions])
+    return _varint(len(actions)) + body + bytes((WINNERS.index(winner) | REASONS.index(reason) << 2,))
+
+def decode_games(payload: bytes, count: int) -> Iterator[GameRecord]:
+    pos = 0
+    for _ in range(count):
+        n = shift = 0
+        while True:
+            b = payload[pos]; pos += 1
+            n |= (b & 0x7F) << shift
+            if b < 0x80:
+                break
+            shift += 7
+        actions = []
+        append = actions.append
+        for _ in range(n):
+            b = payload[pos]; pos += 1
+            if b < 0x80:
+                append(b)
+                continue
+            v = b & 0x7F
+            shift = 7
+            while True:
+                b = payload[pos]; pos += 1
+                v |= (b & 0x7F) << shift
+                if b < 0x80:
+                    break
+                shift += 7
+            append(v)
+        res = payload[pos]; pos += 1
+        yield GameRecord(actions, WINNERS[res & 3], REASONS[res >> 2])
+
+class RecordWriter:
+    # Buffers games and flushes them as one chunk every chunk_games games.
+    # Opening an existing file appends, provided its header matches.
+    def __init__(self, path: str, rules: Rules, compress: bool = True, chunk_games: int = 1024):
+        self.rules = rules
+        self.chunk_games = chunk_games
+        self._table = [_varint(i) for i in range(num_actions(rules.N))]
+        self._buf: List[bytes] = []
+        header = _HEADER.pack(MAGIC, VERSION, *rules.options(), compress)
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, 'rb') as f:
+                old = f.read(_HEADER.size)
+            if old[:-1] != header[:-1]:
+                raise ValueError(f"{path} holds records for different rules or format")
+            self.compress = bool(old[-1])
+            _trim_torn_chunk(path)
+            self._f = open(path, 'ab')
+        else:
+            self.compress = compress
+            self._f = open(path, 'wb')
+            self._f.write(header)
+        self.games = 0
+
+    def write(self, actions, winner: Optional[str], reason: Optional[str] = None):
+        # actions may be action tuples or their indices, NumPy integers included.
+        if len(actions) and not isinstance(actions[0], numbers.Integral):
+            actions = [action_to_index(a, self.rules.N) for a in actions]
+        self._buf.append(encode_game(actions, winner, reason, self._table))
+        self.games += 1
+        if len(self._buf) >= self.chunk_games:
+            self.flush()
+
+    def flush(self):
+        if not self._buf:
+            return
+        raw = b''.join(self._buf)
+        data = zlib.compress(raw, 6) if self.compress else raw
+        self._f.write(_CHUNK.pack(len(data), len(raw), len(self._buf)))
+        self._f.write(data)
+        self._f.flush()
+        self._buf = []
+
+    def close(self):
+        self.flush()
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _chunks(f, compressed: bool) -> Iterator[Tuple[bytes, int]]:
+    while True:
+        head = f.read(_CHUNK.size)
+        if len(head) < _CHUNK.size:
+            return
+        stored, raw, count = _CHUNK.unpack(head)
+        data = f.read(stored)
+        if len(data) < stored:
+            return  # torn chunk from an interrupted writer
+        yield (zlib.decompress(data) if compressed else data), count
+
+def _trim_torn_chunk(path: str):
+    with open(path, 'rb+') as f:
+        f.seek(_HEADER.size)
+        end = f.tell()
+        size = os.fstat(f.fileno()).st_size
+        while end + _CHUNK.size <= size:
+            stored, _, _ = _CHUNK.unpack(f.read(_CHUNK.size))
+            if end + _CHUNK.size + stored > size:
+                break
+            end += _CHUNK.size + stored
+            f.seek(end)
+        if end != size:
+            f.truncate(end)
+
+def read_header(path: str) -> Tuple[Rules, bool]:
+    with open(path, 'rb') as f:
+        magic, version, *options, compressed = _HEADER.unpack(f.read(_HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a game-record file")
+    return make_rules(*options), bool(compressed)
+
+def chunk_offsets(path: str) -> List[Tuple[int, int]]:
+    # (file offset, game count) of every complete chunk, for splitting a file
+    # across workers without decoding it.
+    out = []
+    with open(path, 'rb') as f:
+        f.seek(_HEADER.size)
+        pos = f.tell()
+        size = os.fstat(f.fileno()).st_size
+        while pos + _CHUNK.size <= size:
+            stored, _, count = _CHUNK.unpack(f.read(_CHUNK.size))
+            if pos + _CHUNK.size + stored > size:
+                break
+            out.append((pos, count))
+            pos += _CHUNK.size + stored
+            f.seek(pos)
+    return out
+
+def read_chunks(path: str, offsets) -> Iterator[GameRecord]:
+    # Games of the chunks starting at the given offsets (from chunk_offsets).
+    _, compressed = read_header(path)
+    with open(path, 'rb') as f:
+        for off in offsets:
+            f.seek(off)
+            for payload, count in _chunks(f, compressed):
+                yield from decode_games(payload, count)
+                break
+
+def read_records(path: str) -> Iterator[GameRecord]:
+    # Streams games chunk by chunk; memory use is bounded by one chunk.
+    _, compressed = read_header(path)
+    with open(path, 'rb') as f:
+        f.seek(_HEADER.size)
+        for payload, count in _chunks(f, compressed):
+            yield from decode_games(payload, count)
+
+def replay(path: str) -> Iterator[Tuple[GameRecord, Iterator[Tuple[GameState, Tuple]]]]:
+    # Yields (record, plies) where plies lazily applies the record's actions,
+    # yielding (state before the move, action). The state object is reused.
+    rules, _ = read_header(path)
+    for rec in read_records(path):
+        yield rec, _plies(rec, rules)
+
+def _plies(rec: GameRecord, rules: Rules):
+    gs = initial_state(rules)
+    N = rules.N
+    for i, a in enumerate(rec.actions):
+        act = index_to_action(a, N)
+        yield gs, act
+        if act is None or not apply(gs, rules, act):
+            raise ValueError(f"illegal action {act} at ply {i}")
+
+def to_numpy(path: str, boards: bool = False, limit: Optional[int] = None):
+    # Flattens records into training arrays: per-ply actions and game ids,
+    # per-game offsets and results, and optionally the board before each ply
+    # with the side to move and the final outcome from its point of view.
+    import numpy as np
+    rules, _ = read_header(path)
+    NN = rules.N*rules.N
+    actions, offsets, winners = [], [0], []
+    board_rows, movers, values = [], [], []
+    for g, rec in enumerate(read_records(path)):
+        if limit is not None and g >= limit:
+            break
+        actions.extend(rec.actions)
+        offsets.append(len(actions))
+        winners.append(WINNERS.index(rec.winner))
+        if boards:
+            for gs, _ in _plies(rec, rules):
+                board_rows.append(bytes(gs.board))
+                tiger = gs.player == 'tiger'
+                movers.append(tiger)
+                values.append(0 if rec.winner not in ('goat', 'tiger') else (1 if (rec.winner == 'tiger') == tiger else -1))
+    offsets = np.asarray(offsets, dtype=np.int64)
+    out = {
+        'actions': np.asarray(actions, dtype=np.int16),
+        'offsets': offsets,
+        'game': np.repeat(np.arange(len(winners), dtype=np.int32), np.diff(offsets)),
+        'winner': np.asarray(winners, dtype=np.int8),
+    }
+    if boards:
+        out['boards'] = np.frombuffer(b''.join(board_rows), dtype=np.uint8).reshape(-1, NN)
+        out['tiger_to_move'] = np.asarray(movers, dtype=np.bool_)
+        out['value'] = np.asarray(values, dtype=np.int8)
+    return out
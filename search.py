@@ -0,0 +1,220 @@
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from core import (EMPTY, GOAT, TIGER, Rules, GameState, legal_actions, apply_undo, undo,
+                  is_terminal, position_key_with_counts)
+
+WIN = 100000
+MATE = WIN - 1000  # scores beyond this are wins or losses, WIN - plies from the root
+INF = 10**9
+EXACT, LOWER, UPPER = 0, 1, 2
+
+class _Timeout(Exception):
+    pass
+
+@dataclass
+class SearchStats:
+    nodes: int = 0
+    depth: int = 0
+    score: int = 0
+    tt_probes: int = 0
+    tt_hits: int = 0
+    elapsed: float = 0.0
+    timed_out: bool = False  # the last iteration was cut short by time_limit or stop
+
+    @property
+    def nps(self) -> float:
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def tt_hit_rate(self) -> float:
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    def summary(self) -> str:
+        return (f"depth {self.depth}  score {self.score}  nodes {self.nodes}  "
+                f"{self.nps:,.0f} n/s  TT hits {100*self.tt_hit_rate:.0f}%")
+
+class TranspositionTable:
+    # Fixed number of slots indexed by the low key bits. A slot is replaced when
+    # it is empty, holds the same position, was written by an older search, or
+    # the new entry is searched at least as deep.
+    def __init__(self, size: int = 1 << 18):
+        n = 1
+        while n < size:
+            n <<= 1
+        self.mask = n - 1
+        self.keys: List[Optional[int]] = [None]*n
+        self.entries: List[Optional[Tuple[int,int,int,object,int]]] = [None]*n
+        self.generation = 0
+
+    def new_search(self):
+        self.generation += 1
+
+    def probe(self, key: int):
+        i = key & self.mask
+        if self.keys[i] == key:
+            return self.entries[i]
+        return None
+
+    def store(self, key: int, depth: int, flag: int, score: int, move):
+        i = key & self.mask
+        old = self.entries[i]
+        if old is None or self.keys[i] == key or old[4] != self.generation or depth >= old[0]:
+            self.keys[i] = key
+            self.entries[i] = (depth, flag, score, move, self.generation)
+
+    def clear(self):
+        self.keys = [None]*len(self.keys)
+        self.entries = [None]*len(self.entries)
+
+def _to_tt(score: int, ply: int) -> int:
+    # Mate scores are stored relative to the node, so a transposition reached
+    # at another ply, or in a later search, reads its own distance.
+    if score >= MATE:
+        return score + ply
+    if score <= -MATE:
+        return score - ply
+    return score
+
+def _from_tt(score: int, ply: int) -> int:
+    if score >= MATE:
+        return score - ply
+    if score <= -MATE:
+        return score + ply
+    return score
+
+def evaluate(gs: GameState, rules: Rules) -> int:
+    # Tiger-positive: captures dominate, then capture threats and mobility.
+    b = gs.board
+    safe = rules.safe_nodes
+    score = 1000*gs.goats_captured
+    for t in range(len(b)):
+        if b[t]==TIGER:
+            for x in rules.ADJ[t]:
+                if b[x]==EMPTY:
+                    score += 10
+            for over, land in rules.JUMPS[t]:
+                if b[over]==GOAT and (over not in safe) and b[land]==EMPTY:
+                    score += 150
+    return score if gs.player == 'tiger' else -score
+
+def _ordered(acts, tt_move):
+    jumps = [a for a in acts if a[0] == 'jump']
+    rest = [a for a in acts if a[0] != 'jump']
+    ordered = jumps + rest
+    if tt_move is not None and tt_move in acts:
+        ordered.remove(tt_move)
+        ordered.insert(0, tt_move)
+    return ordered
+
+class AlphaBeta:
+    def __init__(self, rules: Rules, tt_size: int = 1 << 18):
+        self.rules = rules
+        self.tt = TranspositionTable(tt_size)
+        self.stats = SearchStats()
+        self.stop = None
+        self._deadline = 0.0
+
+    def _key(self, gs: GameState) -> int:
+        return position_key_with_counts(gs, self.rules)
+
+    def choose(self, gs: GameState, time_limit: float = 1.0, max_depth: int = 64, stop=None):
+        rules = self.rules
+        self.stats = st = SearchStats()
+        self.stop = stop
+        self.tt.new_search()
+        t0 = time.perf_counter()
+        self._deadline = t0 + time_limit
+        acts = legal_actions(gs, rules)
+        best = acts[0] if acts else None
+        if len(acts) > 1:
+            for depth in range(1, max_depth+1):
+                try:
+                    score, move = self._root(gs, depth, acts, best)
+                except _Timeout:
+                    st.timed_out = True
+                    break
+                best, st.score, st.depth = move, score, depth
+                if abs(score) >= MATE:
+                    break
+        st.elapsed = time.perf_counter() - t0
+        return best
+
+    def _root(self, gs: GameState, depth: int, acts, prev_best):
+        rules = self.rules
+        alpha, beta = -INF, INF
+        best = None
+        player = gs.player
+        for a in _ordered(acts, prev_best):
+            rec = apply_undo(gs, rules, a)
+            try:
+                if gs.player == player:
+                    score = self._negamax(gs, depth-1, alpha, beta, 1)
+                else:
+                    score = -self._negamax(gs, depth-1, -beta, -alpha, 1)
+            finally:
+                undo(gs, rules, rec)
+            if best is None or score > alpha:
+                alpha, best = score, a
+        self.tt.store(self._key(gs), depth, EXACT, alpha, best)
+        return alpha, best
+
+    def _negamax(self, gs: GameState, depth: int, alpha: int, beta: int, ply: int) -> int:
+        rules = self.rules
+        st = self.stats
+        st.nodes += 1
+        if not st.nodes & 1023:
+            if time.perf_counter() > self._deadline or (self.stop is not None and self.stop.is_set()):
+                raise _Timeout()
+        term, winner = is_terminal(gs, rules)
+        if term:
+            if winner == 'draw':
+                return 0
+            return WIN - ply if winner == gs.player else -(WIN - ply)
+        if depth <= 0:
+            return evaluate(gs, rules)
+        key = self._key(gs)
+        st.tt_probes += 1
+        entry = self.tt.probe(key)
+        tt_move = None
+        if entry is not None:
+            st.tt_hits += 1
+            e_depth, flag, e_score, tt_move, _ = entry
+            e_score = _from_tt(e_score, ply)
+            if e_depth >= depth:
+                if flag == EXACT:
+                    return e_score
+                if flag == LOWER and e_score >= beta:
+                    return e_score
+                if flag == UPPER and e_score <= alpha:
+                    return e_score
+        acts = legal_actions(gs, rules)
+        if not acts:
+            return evaluate(gs, rules)
+        alpha0 = alpha
+        best, best_move = -INF, None
+        player = gs.player
+        for a in _ordered(acts, tt_move):
+            rec = apply_undo(gs, rules, a)
+            try:
+                if gs.player == player:
+                    score = self._negamax(gs, depth-1, alpha, beta, ply+1)
+                else:
+                    score = -self._negamax(gs, depth-1, -beta, -alpha, ply+1)
+            finally:
+                undo(gs, rules, rec)
+            if score > best:
+                best, best_move = score, a
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        flag = UPPER if best <= alpha0 else LOWER if best >= beta else EXACT
+        self.tt.store(key, depth, flag, _to_tt(best, ply), best_move)
+        return best
+
+def search_move(gs: GameState, rules: Rules, time_limit: float = 1.0, max_depth: int = 64):
+    engine = AlphaBeta(rules)
+    act = engine.choose(gs, time_limit=time_limit, max_depth=max_depth)
+    return act, engine.stats
@@ -0,0 +1,382 @@
+import argparse
+import asyncio
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+
+from core import (EMPTY, GOAT, TIGER, MAX_PLIES, Rules, GameState, make_rules, initial_state, refresh_status,
+                  record_position, legal_actions, apply, terminal_status, tiger_has_more_jumps_from, tiger_greedy,
+                  goat_greedy, action_to_index, index_to_action)
+from search import AlphaBeta
+
+# Headless analysis over HTTP/1.1 with JSON bodies:
+#   POST /analyze  position + rules -> legal actions, chosen move, terminal status
+#   GET  /stats    request, cache and latency counters
+# A position is either {"actions": [...]} replayed from the initial state, or
+# {"board": ..., "player": ..., ...} given directly. Results are cached by
+# position, so a board reached along different paths shares one entry.
+ENGINES = ('greedy', 'search')
+PIECES = {'.': EMPTY, 'G': GOAT, 'T': TIGER}
+SIZES = (5, 7, 9)
+_MAX_BODY = 1 << 20
+_MAX_HEADERS = 100
+_MAX_ENGINES = 4
+
+class BadRequest(ValueError):
+    pass
+
+def _option(spec: Dict, name: str, default, lo: int = 0, hi: int = 0, prefix: str = 'rules.'):
+    # Ints must be JSON integers in [lo, hi], flags JSON booleans.
+    v = spec.get(name, default)
+    if isinstance(default, bool):
+        if not isinstance(v, bool):
+            raise BadRequest(f"{prefix}{name} must be true or false")
+    elif isinstance(v, bool) or not isinstance(v, int) or not lo <= v <= hi:
+        raise BadRequest(f"{prefix}{name} must be an integer in [{lo}, {hi}]")
+    return v
+
+def rules_from(spec: Dict) -> Rules:
+    # Only whitelisted options reach make_rules, so a client cannot make the
+    # server build tables for arbitrary boards.
+    if not isinstance(spec, dict):
+        raise BadRequest("rules must be a JSON object")
+    unknown = set(spec) - {'N', 'goats_to_place', 'capture_to_win', 'enable_multijump', 'enable_ko', 'sanctuaries'}
+    if unknown:
+        raise BadRequest(f"unknown rules options {sorted(unknown)}")
+    N = spec.get('N', 7)
+    if isinstance(N, bool) or not isinstance(N, int) or N not in SIZES:
+        raise BadRequest(f"rules.N must be one of {SIZES}")
+    goats = _option(spec, 'goats_to_place', min(30, N*N - 4), 1, N*N - 4)
+    captures = _option(spec, 'capture_to_win', min(8, goats), 1, goats)
+    return make_rules(N, goats_to_place=goats, capture_to_win=captures,
+                      enable_multijump=_option(spec, 'enable_multijump', True),
+                      enable_ko=_option(spec, 'enable_ko', True), sanctuaries=_option(spec, 'sanctuaries', True))
+
+def _action(a, N: int):
+    # Actions arrive as indices or as lists like ["move", 10, 11].
+    if isinstance(a, int):
+        act = index_to_action(a, N) if 0 <= a < 17*N*N else None
+    elif isinstance(a, list) and a and a[0] in ('place', 'move', 'jump'):
+        act = tuple(a)
+    else:
+        act = None
+    if act is None:
+        raise BadRequest(f"bad action {a!r}")
+    return act
+
+def state_from(req: Dict, rules: Rules) -> GameState:
+    N = rules.N
+    if 'actions' in req:
+        gs = initial_state(rules)
+        for i, a in enumerate(req['actions']):
+            act = _action(a, N)
+            if terminal_status(gs, rules)[0] is not None or act not in legal_actions(gs, rules):
+                raise BadRequest(f"illegal action {a!r} at ply {i}")
+            apply(gs, rules, act)
+        return gs
+    board = req.get('board')
+    if isinstance(board, str):
+        board = [PIECES.get(ch) for ch in board if not ch.isspace()]
+    if not isinstance(board, list) or len(board) != N*N or any(v not in (EMPTY, GOAT, TIGER) for v in board):
+        raise BadRequest(f"board must hold {N*N} squares of '.GT' or 0/1/2")
+    player = req.get('player', 'goat')
+    if player not in ('goat', 'tiger'):
+        raise BadRequest(f"bad player {player!r}")
+    chain_src = req.get('chain_src')
+    if chain_src is not None and (not isinstance(chain_src, int) or not 0 <= chain_src < N*N
+                                  or board[chain_src] != TIGER or player != 'tiger' or not rules.enable_multijump):
+        raise BadRequest("chain_src must be a tiger square with the tiger to move and multi-jump enabled")
+    # The counts must describe a reachable position: four tigers, and every
+    # goat placed so far either on the board or captured.
+    placed = _option(req, 'goats_placed', rules.goats_to_place, 0, rules.goats_to_place, '')
+    captured = _option(req, 'goats_captured', 0, 0, min(placed, rules.capture_to_win), '')
+    move_count = _option(req, 'move_count', 0, 0, MAX_PLIES, '')
+    if board.count(TIGER) != 4:
+        raise BadRequest(f"board must hold 4 tigers, not {board.count(TIGER)}")
+    if board.count(GOAT) != placed - captured:
+        raise BadRequest(f"board holds {board.count(GOAT)} goats, but goats_placed - goats_captured is "
+                         f"{placed - captured}")
+    gs = GameState(board=board, goats_placed=placed, goats_captured=captured, player=player, move_count=move_count,
+                   chain_active=chain_src is not None, chain_src=chain_src)
+    if chain_src is not None and not tiger_has_more_jumps_from(chain_src, gs, rules):
+        raise BadRequest("chain_src has no further jump")
+    refresh_status(gs, rules)
+    record_position(gs)
+    return gs
+
+def cache_key(gs: GameState, rules: Rules, engine: str, depth: int) -> Tuple:
+    # Everything the answer depends on besides the earlier history: the
+    # repetition count of this board decides ko, move_count the ply cap.
+    # The time limit is left out; only searches that reached depth are cached.
+    return (rules.options(), bytes(gs.board), gs.player, gs.chain_src if gs.chain_active else None, gs.goats_placed,
+            gs.goats_captured, gs.move_count, gs.seen_counts.get(gs.zkey, 0), engine, depth)
+
+_engines: 'OrderedDict[Tuple, AlphaBeta]' = OrderedDict()
+
+def _engine(rules: Rules) -> AlphaBeta:
+    # One search (and transposition table) per rule set, the least recently
+    # used dropped beyond _MAX_ENGINES.
+    key = rules.options()
+    ab = _engines.pop(key, None)
+    if ab is None:
+        ab = AlphaBeta(rules, tt_size=1 << 16)
+    _engines[key] = ab
+    if len(_engines) > _MAX_ENGINES:
+        _engines.popitem(last=False)
+    return ab
+
+def analyze(gs: GameState, rules: Rules, engine: str, depth: int, time_limit: float) -> Tuple[bytes, bool]:
+    # Runs in a pool worker; returns the encoded response body and whether it
+    # may be cached, i.e. it does not depend on time_limit.
+    winner, reason = terminal_status(gs, rules)
+    acts = [] if winner is not None else legal_actions(gs, rules)
+    out = {'legal': [list(a) for a in acts], 'legal_index': [action_to_index(a, rules.N) for a in acts],
+           'status': {'winner': winner, 'reason': reason}, 'player': gs.player, 'move': None, 'move_index': None}
+    complete = True
+    if acts:
+        if engine == 'search':
+            ab = _engine(rules)
+            move = ab.choose(gs, time_limit=time_limit, max_depth=depth)
+            out['score'] = ab.stats.score
+            out['depth'] = ab.stats.depth
+            complete = not ab.stats.timed_out
+        else:
+            move = tiger_greedy(gs, rules) if gs.player == 'tiger' else goat_greedy(gs, rules)
+        if move is not None:
+            out['move'] = list(move)
+            out['move_index'] = action_to_index(move, rules.N)
+    return json.dumps(out).encode(), complete
+
+class ResultCache:
+    # LRU over encoded responses, bounded by entry count and total bytes.
+    def __init__(self, max_entries: int = 100_000, max_bytes: int = 64 << 20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._d: 'OrderedDict[Tuple, bytes]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._d)
+
+    def get(self, key) -> Optional[bytes]:
+        v = self._d.get(key)
+        if v is not None:
+            self._d.move_to_end(key)
+        return v
+
+    def put(self, key, value: bytes):
+        if len(value) > self.max_bytes:
+            return
+        old = self._d.pop(key, None)
+        if old is not None:
+            self.bytes -= len(old)
+        self._d[key] = value
+        self.bytes += len(value)
+        while len(self._d) > self.max_entries or self.bytes > self.max_bytes:
+            _, v = self._d.popitem(last=False)
+            self.bytes -= len(v)
+
+@dataclass
+class ServerStats:
+    requests: int = 0
+    cache_hits: int = 0
+    merged: int = 0
+    analyses: int = 0
+    errors: int = 0
+    started: float = field(default_factory=time.perf_counter)
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=10000))
+
+    def latency(self, q: float) -> float:
+        if not self.latencies:
+            return 0.0
+        xs = sorted(self.latencies)
+        return xs[min(len(xs) - 1, int(q * len(xs)))]
+
+    def to_dict(self, cache: ResultCache, inflight: int) -> Dict:
+        return {'requests': self.requests, 'cache_hits': self.cache_hits, 'merged': self.merged,
+                'analyses': self.analyses, 'errors': self.errors, 'inflight': inflight,
+                'cache_entries': len(cache), 'cache_bytes': cache.bytes,
+                'hit_rate': self.cache_hits / self.requests if self.requests else 0.0,
+                'p50_ms': 1e3*self.latency(0.5), 'p99_ms': 1e3*self.latency(0.99),
+                'uptime_s': time.perf_counter() - self.started}
+
+class AnalysisServer:
+    def __init__(self, workers: int = 1, cache: Optional[ResultCache] = None, max_depth: int = 6,
+                 max_time: float = 5.0):
+        self.workers = workers
+        self.cache = cache if cache is not None else ResultCache()
+        self.max_depth = max_depth
+        self.max_time = max_time
+        self.stats = ServerStats()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._inflight: Dict[Tuple, asyncio.Future] = {}  # by (cache key, time limit)
+        self._clients: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8765):
+        # Spawned, not forked: a forked worker would inherit open client
+        # sockets and keep them alive after the server closes them.
+        self._pool = ProcessPoolExecutor(self.workers, mp_context=mp.get_context('spawn'))
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._pool, int) for _ in range(self.workers)))  # start them now
+        self._server = await asyncio.start_server(self._client, host, port)
+        return self._server
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for writer in self._clients.values():
+            writer.close()  # open keep-alive connections see EOF and their handlers return
+        await asyncio.gather(*self._clients, return_exceptions=True)
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    @property
+    def port(self) -> int:
+        return self._server.sockets[0].getsockname()[1]
+
+    async def analyze(self, req: Dict) -> bytes:
+        # Cached result, or a share in an identical analysis already running,
+        # or a new job on the pool.
+        if not isinstance(req, dict):
+            raise BadRequest("request body must be a JSON object")
+        rules = rules_from(req.get('rules') or {})
+        gs = state_from(req, rules)
+        engine = req.get('engine', 'greedy')
+        if engine not in ENGINES:
+            raise BadRequest(f"engine must be one of {ENGINES}")
+        depth = min(int(req.get('depth', 2)), self.max_depth) if engine == 'search' else 0
+        time_limit = float(req.get('time_limit', self.max_time))
+        if not time_limit > 0:
+            raise BadRequest("time_limit must be a positive number of seconds")
+        time_limit = min(time_limit, self.max_time)
+        key = cache_key(gs, rules, engine, depth)
+        body = self.cache.get(key)
+        if body is not None:
+            self.stats.cache_hits += 1
+            return body
+        job = (key, time_limit if engine == 'search' else None)
+        fut = self._inflight.get(job)
+        if fut is not None:
+            self.stats.merged += 1
+            return (await asyncio.shield(fut))[0]
+        # The job outlives its first caller, so a client hanging up does not
+        # fail the others merged onto it.
+        fut = asyncio.get_running_loop().run_in_executor(self._pool, analyze, gs, rules, engine, depth, time_limit)
+        self._inflight[job] = fut
+        fut.add_done_callback(lambda f: self._finished(job, f))
+        return (await asyncio.shield(fut))[0]
+
+    def _finished(self, job, fut: asyncio.Future):
+        del self._inflight[job]
+        if not fut.cancelled() and fut.exception() is None:
+            self.stats.analyses += 1
+            body, complete = fut.result()
+            if complete:
+                self.cache.put(job[0], body)
+
+    async def handle(self, method: str, path: str, body: bytes) -> Tuple[int, bytes]:
+        if path == '/stats' and method == 'GET':
+            return 200, json.dumps(self.stats.to_dict(self.cache, len(self._inflight))).encode()
+        if path == '/analyze' and method == 'POST':
+            t0 = time.perf_counter()
+            self.stats.requests += 1
+            try:
+                out = await self.analyze(json.loads(body))
+            except (BadRequest, json.JSONDecodeError, TypeError, ValueError) as e:
+                self.stats.errors += 1
+                return 400, json.dumps({'error': str(e)}).encode()
+            except Exception as e:  # a crashed worker, for one
+                self.stats.errors += 1
+                return 500, json.dumps({'error': f"{type(e).__name__}: {e}"}).encode()
+            self.stats.latencies.append(time.perf_counter() - t0)
+            return 200, out
+        return 404, b'{"error": "not found"}'
+
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # Minimal HTTP/1.1: Content-Length bodies and keep-alive, nothing else.
+        task = asyncio.current_task()
+        self._clients[task] = writer
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    method, path, version = line.decode('latin-1').split()
+                except ValueError:
+                    break
+                headers = {}
+                error = None
+                for _ in range(_MAX_HEADERS + 1):
+                    h = await reader.readline()
+                    if h in (b'\r\n', b'\n', b''):
+                        break
+                    k, _, v = h.decode('latin-1').partition(':')
+                    headers[k.strip().lower()] = v.strip()
+                else:
+                    error = b'{"error": "too many headers"}'
+                try:
+                    n = int(headers.get('content-length', 0) or 0)
+                except ValueError:
+                    n = -1
+                if error is None and n < 0:
+                    error = b'{"error": "bad Content-Length"}'
+                if error is not None:
+                    status, out = 400, error
+                elif n > _MAX_BODY:
+                    status, out = 413, b'{"error": "body too large"}'
+                else:
+                    status, out = await self.handle(method, path.split('?')[0], await reader.readexactly(n))
+                close = headers.get('connection', '').lower() == 'close' or version == 'HTTP/1.0'
+                writer.write(b'HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n%s\r\n'
+                             % (status, _REASONS.get(status, b'Error'), len(out),
+                                b'Connection: close\r\n' if close else b'') + out)
+                await writer.drain()
+                if close or error is not None or n > _MAX_BODY:  # the unread rest leaves the stream unframed
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            del self._clients[task]
+            writer.close()
+
+_REASONS = {200: b'OK', 400: b'Bad Request', 404: b'Not Found', 413: b'Payload Too Large', 500: b'Internal Server Error'}
+
+async def serve(args):
+    server = AnalysisServer(args.workers, ResultCache(args.cache_entries, args.cache_mb << 20), args.max_depth,
+                            args.max_time)
+    srv = await server.start(args.host, args.port)
+    print(f"analysis server on http://{args.host}:{server.port} with {args.workers} workers", file=sys.stderr)
+    try:
+        async with srv:
+            await srv.serve_forever()
+    finally:
+        await server.close()
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Local JSON/HTTP analysis server for Bagh-Chal positions.")
+    ap.add_argument('--host', default='127.0.0.1')
+    ap.add_argument('--port', type=int, default=8765)
+    ap.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    ap.add_argument('--cache-entries', type=int, default=100_000)
+    ap.add_argument('--cache-mb', type=int, default=64)
+    ap.add_argument('--max-depth', type=int, default=6, help="cap on the search depth a request may ask for")
+    ap.add_argument('--max-time', type=float, default=5.0, help="cap on search seconds per request")
+    args = ap.parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
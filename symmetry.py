@@ -0,0 +1,101 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Tuple
+
+from core import Rules, GameState, idx, rcOf, board_hash
+
+# The eight rotations/reflections of the square as (r, c) -> (r', c') maps.
+_D4 = (
+    lambda r, c, N: (r, c),
+    lambda r, c, N: (c, N-1-r),
+    lambda r, c, N: (N-1-r, N-1-c),
+    lambda r, c, N: (N-1-c, r),
+    lambda r, c, N: (r, N-1-c),
+    lambda r, c, N: (N-1-r, c),
+    lambda r, c, N: (c, r),
+    lambda r, c, N: (N-1-c, N-1-r),
+)
+
+@dataclass(frozen=True)
+class Symmetries:
+    perms: Tuple[Tuple[int, ...], ...]
+    inverse: Tuple[Tuple[int, ...], ...]
+    zpiece: Tuple[Tuple[Tuple[int, ...], ...], ...]  # [square][piece] -> hash per symmetry
+    zside: int
+    zchain: Tuple[Tuple[int, ...], ...]              # [square] -> hash per symmetry
+
+@lru_cache(maxsize=64)  # bounded like core._cached_rules: each entry keeps its Rules alive
+def symmetries(rules: Rules) -> Symmetries:
+    # Keeps only the transforms that map the graph, sanctuaries and tiger corners onto themselves.
+    N = rules.N
+    NN = N*N
+    edges = {(i, j) for i in range(NN) for j in rules.ADJ[i]}
+    corners = {0, N-1, N*(N-1), NN-1}
+    perms = []
+    for f in _D4:
+        p = tuple(idx(*f(*rcOf(i, N), N), N) for i in range(NN))
+        if ({(p[i], p[j]) for i, j in edges} == edges and {p[s] for s in rules.safe_nodes} == rules.safe_nodes
+                and {p[s] for s in corners} == corners):
+            perms.append(p)
+    inverse = []
+    for p in perms:
+        inv = [0]*NN
+        for i, j in enumerate(p):
+            inv[j] = i
+        inverse.append(tuple(inv))
+    Z = rules.Z
+    zpiece = tuple(tuple(tuple(Z.piece[p[i]][v] for p in perms) for v in range(4)) for i in range(NN))
+    zchain = tuple(tuple(Z.chain[p[i]] for p in perms) for i in range(NN))
+    return Symmetries(perms=tuple(perms), inverse=tuple(inverse), zpiece=zpiece, zside=Z.side, zchain=zchain)
+
+def canonical_key(gs: GameState, rules: Rules) -> Tuple[int, int]:
+    # Smallest position_key over the symmetry class, and the symmetry reaching it.
+    sy = symmetries(rules)
+    k = len(sy.perms)
+    h = [0]*k
+    zp = sy.zpiece
+    for i, v in enumerate(gs.board):
+        if v:
+            zs = zp[i][v]
+            for s in range(k):
+                h[s] ^= zs[s]
+    if gs.chain_active and gs.chain_src is not None:
+        zc = sy.zchain[gs.chain_src]
+        for s in range(k):
+            h[s] ^= zc[s]
+    best = min(range(k), key=h.__getitem__)
+    key = h[best]
+    if gs.player == 'tiger':
+        key ^= sy.zside
+    return key, best
+
+def transform_board(board: List[int], perm: Tuple[int, ...]) -> List[int]:
+    out = [0]*len(board)
+    for i, v in enumerate(board):
+        out[perm[i]] = v
+    return out
+
+def transform_action(action, perm: Tuple[int, ...]):
+    if action is None:
+        return None
+    return (action[0],) + tuple(perm[x] for x in action[1:])
+
+def transform_state(gs: GameState, rules: Rules, sym: int) -> GameState:
+    # Position only: the repetition history is restarted from the transformed board.
+    perm = symmetries(rules).perms[sym]
+    board = transform_board(gs.board, perm)
+    chain_src = perm[gs.chain_src] if gs.chain_src is not None else None
+    zkey = board_hash(board, rules.Z)
+    return GameState(board=board, goats_placed=gs.goats_placed, goats_captured=gs.goats_captured,
+                     player=gs.player, move_count=gs.move_count, chain_active=gs.chain_active,
+                     chain_src=chain_src, seen_counts={zkey: 1}, zkey=zkey, tiger_mobility=gs.tiger_mobility)
+
+def canonical_state(gs: GameState, rules: Rules) -> Tuple[GameState, int]:
+    _, sym = canonical_key(gs, rules)
+    return transform_state(gs, rules, sym), sym
+
+def to_canonical(action, rules: Rules, sym: int):
+    return transform_action(action, symmetries(rules).perms[sym])
+
+def from_canonical(action, rules: Rules, sym: int):
+    return transform_action(action, symmetries(rules).inverse[sym])
@@ -0,0 +1,393 @@
+import argparse
+import mmap
+import multiprocessing as mp
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from functools import lru_cache
+from itertools import combinations
+from math import comb
+from typing import List, Optional, Tuple
+
+from core import (EMPTY, GOAT, TIGER, Rules, GameState, make_rules, board_hash, legal_actions, apply_undo, undo,
+                  tiger_has_more_jumps_from)
+
+# Retrograde tables for the movement phase. A material class is fixed by the
+# capture count c (goats on board = goats_to_place - c), and a position in it
+# is indexed as ((tiger_rank * C(NN-4, goats) + goat_rank) * SLOTS + slot),
+# ranks being lexicographic over itertools.combinations order. Slot 0 is goat
+# to move, 1 tiger to move, 2+k a multi-jump chain by the k-th tiger.
+#
+# Values are int16 for the side to move: +d wins in d plies, -(d+1) loses in
+# d plies, 0 is a draw. Repetition history and the MAX_PLIES cap are ignored,
+# so results describe the position as if reached fresh.
+#
+# Pass k settles exactly the positions decided in k plies (a win by its
+# shortest line, a loss by its longest), so distances are minimal even when
+# a longer line through the already solved class above is visible early.
+# Passes in which nothing could be settled are skipped.
+TIGERS = 4
+SLOTS = 2 + TIGERS
+INVALID = -32768
+MAGIC, PART_MAGIC, VERSION = b'BCTB', b'BCTP', 1
+_HEADER = struct.Struct('<4sHBBBBBBIB')  # magic, version, rules options, block size, classes
+_CLASS = struct.Struct('<BQQ')           # captures, entries, offset of the block index
+_PART = struct.Struct('<4sIBxxx')        # magic, last distance settled, done (padded to align values)
+
+def decode(v: int) -> Tuple[str, int]:
+    if v > 0:
+        return 'win', v
+    if v < 0:
+        return 'loss', -v - 1
+    return 'draw', 0
+
+class Indexer:
+    def __init__(self, rules: Rules, captured: int):
+        self.rules = rules
+        self.captured = captured
+        self.NN = NN = rules.N*rules.N
+        self.goats = rules.goats_to_place - captured
+        if self.goats < 0 or self.goats > NN - TIGERS:
+            raise ValueError(f"{self.goats} goats do not fit on the board")
+        self.tigers = list(combinations(range(NN), TIGERS))
+        self.t_rank = {t: i for i, t in enumerate(self.tigers)}
+        self.CG = comb(NN - TIGERS, self.goats)
+        self.size = len(self.tigers) * self.CG * SLOTS
+        # prefix[i][c]: combinations skipped when the i-th goat sits at compressed square c.
+        n, k = NN - TIGERS, self.goats
+        self.prefix = []
+        for i in range(k):
+            row, acc = [0], 0
+            for j in range(n):
+                acc += comb(n-1-j, k-1-i)
+                row.append(acc)
+            self.prefix.append(row)
+
+    def index(self, gs: GameState) -> int:
+        b = gs.board
+        tig = []
+        rank = 0
+        prev = 0
+        i = 0
+        j = 0
+        prefix = self.prefix
+        for sq in range(self.NN):
+            v = b[sq]
+            if v == TIGER:
+                tig.append(sq)
+                continue
+            if v == GOAT:
+                row = prefix[i]
+                rank += row[j] - row[prev]
+                prev = j + 1
+                i += 1
+            j += 1
+        if gs.player == 'goat':
+            slot = 0
+        elif gs.chain_active and gs.chain_src is not None:
+            slot = 2 + tig.index(gs.chain_src)
+        else:
+            slot = 1
+        return (self.t_rank[tuple(tig)] * self.CG + rank) * SLOTS + slot
+
+def _values(path: str, header: int):
+    f = open(path, 'rb')
+    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    f.close()
+    return mm, memoryview(mm)[header:].cast('h')
+
+def _evaluate(gs: GameState, rules: Rules, ix: Indexer, cur, up_ix: Optional[Indexer], up) -> int:
+    # Value implied by the current table, or 0 while any reply is undecided
+    # and no winning reply is known.
+    acts = legal_actions(gs, rules)
+    if not acts:
+        return -1 if gs.player == 'tiger' else 0  # blocked tiger loses now; a stuck goat is a draw
+    best_win = None
+    worst_loss = -1
+    unresolved = False
+    mover = gs.player
+    for a in acts:
+        rec = apply_undo(gs, rules, a)
+        if gs.goats_captured >= rules.capture_to_win:
+            res, d = 'win', 0
+        else:
+            v = cur[ix.index(gs)] if gs.goats_captured == ix.captured else up[up_ix.index(gs)]
+            res, d = decode(v)
+            if gs.player != mover and res != 'draw':
+                res = 'loss' if res == 'win' else 'win'
+        undo(gs, rules, rec)
+        if res == 'win':
+            if best_win is None or d < best_win:
+                best_win = d
+        elif res == 'loss':
+            worst_loss = max(worst_loss, d)
+        else:
+            unresolved = True
+    if best_win is not None:
+        return best_win + 1
+    if unresolved:
+        return 0
+    return -(worst_loss + 1) - 1
+
+def _pass_chunk(job):
+    # One synchronous pass over tiger ranks [lo, hi) of a class, reading the
+    # previous pass from disk and settling values of at most `horizon` plies.
+    # Returns the chunk's new values, change count and the shortest distance
+    # found but held back (None if none was).
+    options, captured, part, upper, lo, hi, horizon = job
+    rules = make_rules(*options)
+    ix = Indexer(rules, captured)
+    mm, cur = _values(part, _PART.size)
+    up_ix, up, umm = None, None, None
+    if upper is not None:
+        up_ix = Indexer(rules, captured + 1)
+        umm, up = _values(upper, _PART.size)
+    NN = ix.NN
+    goat_combos = list(combinations(range(NN - TIGERS), ix.goats))
+    base = lo * ix.CG * SLOTS
+    out = array('h', cur[base:hi * ix.CG * SLOTS])
+    changed = 0
+    deferred = None
+    gs = GameState(board=[EMPTY]*NN, goats_placed=rules.goats_to_place, goats_captured=captured,
+                   player='goat', move_count=0)
+    for t in range(lo, hi):
+        tig = ix.tigers[t]
+        free = [sq for sq in range(NN) if sq not in tig]
+        for g, goats in enumerate(goat_combos):
+            at = (t * ix.CG + g) * SLOTS - base
+            if all(out[at:at + SLOTS]):
+                continue
+            board = [EMPTY]*NN
+            for sq in tig:
+                board[sq] = TIGER
+            for j in goats:
+                board[free[j]] = GOAT
+            gs.board = board
+            gs.zkey = board_hash(board, rules.Z)
+            for slot in range(SLOTS):
+                if out[at + slot]:
+                    continue
+                if slot >= 2:
+                    src = tig[slot - 2]
+                    if not rules.enable_multijump or not tiger_has_more_jumps_from(src, gs, rules):
+                        out[at + slot] = INVALID
+                        changed += 1
+                        continue
+                gs.player = 'goat' if slot == 0 else 'tiger'
+                gs.chain_active = slot >= 2
+                gs.chain_src = tig[slot - 2] if slot >= 2 else None
+                gs.seen_counts = {}
+                v = _evaluate(gs, rules, ix, cur, up_ix, up)
+                if v:
+                    d = decode(v)[1]
+                    if d <= horizon:
+                        out[at + slot] = v
+                        changed += 1
+                    elif deferred is None or d < deferred:
+                        deferred = d
+    del cur, up
+    mm.close()
+    if umm is not None:
+        umm.close()
+    return lo, out.tobytes(), changed, deferred
+
+def _write_part(path: str, settled: int, done: bool, values: array):
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(_PART.pack(PART_MAGIC, settled, done))
+        values.tofile(f)
+    os.replace(tmp, path)
+
+def _read_part(path: str):
+    with open(path, 'rb') as f:
+        magic, settled, done = _PART.unpack(f.read(_PART.size))
+        if magic != PART_MAGIC:
+            raise ValueError(f"{path} is not a tablebase checkpoint")
+        values = array('h')
+        values.frombytes(f.read())
+    return settled, bool(done), values
+
+def solve_class(rules: Rules, captured: int, part: str, upper: Optional[str], workers: int = 1,
+                chunk: int = 64, log=None) -> array:
+    ix = Indexer(rules, captured)
+    if os.path.exists(part):
+        settled, done, values = _read_part(part)
+        if len(values) != ix.size:
+            raise ValueError(f"{part} does not match class {captured}")
+        if done:
+            return values
+        horizon = settled + 1
+    else:
+        values = array('h', bytes(2 * ix.size))
+        _write_part(part, 0, False, values)
+        horizon = 1
+    T = len(ix.tigers)
+    pool = mp.Pool(workers) if workers > 1 else None
+    try:
+        while True:
+            t0 = time.perf_counter()
+            jobs = [(rules.options(), captured, part, upper, lo, min(T, lo + chunk), horizon)
+                    for lo in range(0, T, chunk)]
+            results = pool.imap_unordered(_pass_chunk, jobs) if pool else map(_pass_chunk, jobs)
+            changed = 0
+            deferred = None
+            span = ix.CG * SLOTS
+            for lo, data, n, d in results:
+                chunk_values = array('h')
+                chunk_values.frombytes(data)
+                values[lo*span:lo*span + len(chunk_values)] = chunk_values
+                changed += n
+                if d is not None and (deferred is None or d < deferred):
+                    deferred = d
+            done = changed == 0 and deferred is None
+            _write_part(part, horizon, done, values)
+            if log:
+                log(f"class {captured}: distance {horizon} resolved {changed} in {time.perf_counter() - t0:.1f}s")
+            if done:
+                return values
+            # With nothing new settled the table is unchanged, so the next
+            # pass that can settle anything is the shortest held-back one.
+            horizon = horizon + 1 if changed else deferred
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+def write_tablebase(path: str, rules: Rules, classes, block: int = 4096):
+    # classes: list of (captured, values); each class is split into zlib blocks
+    # behind an offset index so a probe only inflates one block.
+    head = _HEADER.size + _CLASS.size * len(classes)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(bytes(head))
+        entries = []
+        for captured, values in classes:
+            blobs = [zlib.compress(values[i:i + block].tobytes(), 6) for i in range(0, len(values), block)]
+            offsets = array('Q')
+            pos = f.tell() + 8 * (len(blobs) + 1)
+            for b in blobs:
+                offsets.append(pos)
+                pos += len(b)
+            offsets.append(pos)
+            entries.append((captured, len(values), f.tell()))
+            offsets.tofile(f)
+            for b in blobs:
+                f.write(b)
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, VERSION, *rules.options(), block, len(classes)))
+        for e in entries:
+            f.write(_CLASS.pack(*e))
+    os.replace(tmp, path)
+
+def generate(rules: Rules, path: str, min_captured: int, workers: int = 1, chunk: int = 64, log=None) -> int:
+    # Solves classes from capture_to_win-1 down to min_captured; each needs the one above it.
+    # Checkpoints live next to path and let an interrupted run resume pass by pass.
+    solved = []
+    upper = None
+    for c in range(rules.capture_to_win - 1, min_captured - 1, -1):
+        part = f"{path}.c{c}.part"
+        solved.append((c, solve_class(rules, c, part, upper, workers, chunk, log)))
+        upper = part
+    solved.reverse()
+    write_tablebase(path, rules, solved)
+    for c, _ in solved:
+        os.remove(f"{path}.c{c}.part")
+    return sum(len(v) for _, v in solved)
+
+class Tablebase:
+    def __init__(self, path: str, rules: Rules, cache_blocks: int = 256):
+        self._file = open(path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, *options, block, n = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a tablebase")
+        if tuple(options) != tuple(int(x) for x in rules.options()):
+            self.close()
+            raise ValueError(f"{path} was built for different rules {tuple(options)}")
+        self.rules = rules
+        self.block = block
+        self.classes = {}
+        for i in range(n):
+            captured, size, offset = _CLASS.unpack_from(self._mm, _HEADER.size + i*_CLASS.size)
+            self.classes[captured] = (Indexer(rules, captured), size, offset)
+        self._block = lru_cache(maxsize=cache_blocks)(self._load_block)
+
+    def _load_block(self, captured: int, b: int) -> memoryview:
+        _, _, offset = self.classes[captured]
+        lo, hi = struct.unpack_from('<QQ', self._mm, offset + 8*b)
+        return memoryview(zlib.decompress(self._mm[lo:hi])).cast('h')
+
+    def value(self, gs: GameState) -> Optional[int]:
+        if gs.goats_placed < self.rules.goats_to_place or gs.goats_captured not in self.classes:
+            return None
+        ix = self.classes[gs.goats_captured][0]
+        i = ix.index(gs)
+        v = self._block(gs.goats_captured, i // self.block)[i % self.block]
+        return None if v == INVALID else v
+
+    def probe(self, gs: GameState) -> Optional[Tuple[str, int]]:
+        # ('win' | 'loss' | 'draw', plies) for the side to move, or None if not covered.
+        v = self.value(gs)
+        return None if v is None else decode(v)
+
+    def best_action(self, gs: GameState):
+        # Fastest win, slowest loss, otherwise any drawing move.
+        rules = self.rules
+        best, best_score = None, None
+        for a in legal_actions(gs, rules):
+            mover = gs.player
+            rec = apply_undo(gs, rules, a)
+            if gs.goats_captured >= rules.capture_to_win:
+                v = 1 if mover == 'tiger' else -1
+            else:
+                v = self.value(gs)
+                if v is not None and gs.player != mover:
+                    v = -v
+            undo(gs, rules, rec)
+            if v is None:
+                return None
+            score = 2**16 - v if v > 0 else (-2**16 - v if v < 0 else 0)
+            if best_score is None or score > best_score:
+                best, best_score = a, score
+        return best
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Generate movement-phase endgame tablebases by retrograde analysis.")
+    ap.add_argument('--out', default='endgame.tb')
+    ap.add_argument('--N', type=int, default=5)
+    ap.add_argument('--goats-to-place', type=int, default=20)
+    ap.add_argument('--capture-to-win', type=int, default=1)
+    ap.add_argument('--min-captured', type=int, help="lowest capture count to solve (default capture_to_win-1)")
+    ap.add_argument('--max-empty', type=int, default=4, help="refuse classes with more empty squares")
+    ap.add_argument('--no-multijump', action='store_true')
+    ap.add_argument('--no-ko', action='store_true')
+    ap.add_argument('--no-sanctuaries', action='store_true')
+    ap.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    ap.add_argument('--chunk', type=int, default=64, help="tiger placements per work item")
+    args = ap.parse_args(argv)
+
+    rules = make_rules(args.N, goats_to_place=args.goats_to_place, capture_to_win=args.capture_to_win,
+                       enable_multijump=not args.no_multijump, enable_ko=not args.no_ko,
+                       sanctuaries=not args.no_sanctuaries)
+    lo = args.capture_to_win - 1 if args.min_captured is None else args.min_captured
+    NN = args.N*args.N
+    for c in range(lo, args.capture_to_win):
+        empty = NN - TIGERS - (args.goats_to_place - c)
+        if empty > args.max_empty:
+            raise SystemExit(f"class with {c} captures has {empty} empty squares (> --max-empty {args.max_empty})")
+    t0 = time.perf_counter()
+    n = generate(rules, args.out, lo, max(1, args.workers), args.chunk, lambda s: print(s, file=sys.stderr))
+    print(f"wrote {n} entries to {args.out} in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
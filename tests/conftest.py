@@ -0,0 +1,40 @@
+import os
+import random
+import sys
+
+import pytest
+
+# The modules live at the repository root rather than in a package.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import make_7x7_rules, make_5x5_rules, make_rules, initial_state, legal_actions, apply, is_terminal
+
+RULE_SETS = {
+    '7x7': make_7x7_rules(),
+    '5x5': make_5x5_rules(),
+    '7x7-plain': make_rules(7, enable_multijump=False, enable_ko=False, sanctuaries=False),
+}
+
+@pytest.fixture(params=sorted(RULE_SETS))
+def rules(request):
+    return RULE_SETS[request.param]
+
+def random_games(rules, games: int, policy=None, p_policy: float = 0.0, seed=None):
+    # Yields (gs, action) for every position of seeded games, the action being
+    # applied once the consumer resumes; action is None at the last position,
+    # which is terminal or leaves the side to move without a legal action.
+    # policy(gs, rules) picks the move with probability p_policy, a uniformly
+    # random legal move is played otherwise or when it returns None.
+    rng = random.Random(repr(rules.options()) if seed is None else seed)
+    for _ in range(games):
+        gs = initial_state(rules)
+        while True:
+            acts = [] if is_terminal(gs, rules)[0] else legal_actions(gs, rules)
+            if not acts:
+                yield gs, None
+                break
+            act = policy(gs, rules) if policy is not None and rng.random() < p_policy else None
+            if act is None:
+                act = rng.choice(acts)
+            yield gs, act
+            assert apply(gs, rules, act)
@@ -0,0 +1,58 @@
+from dataclasses import replace
+
+import pytest
+
+from core import make_7x7_rules, make_rules, legal_actions, apply
+from book import OpeningBook, build_book, collect_positions, book_key
+from symmetry import symmetries, canonical_key, transform_state
+
+RULES = make_7x7_rules()
+
+def _after(gs, act):
+    gs = replace(gs, board=gs.board[:], seen_counts=dict(gs.seen_counts))
+    assert apply(gs, RULES, act)
+    return canonical_key(gs, RULES)[0]
+
+@pytest.fixture(scope='module')
+def book_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('book') / 'opening.book')
+    assert build_book(RULES, path, plies=6, games=40, depth=1, min_visits=1) > 0
+    return path
+
+def test_lookup_covers_every_symmetric_image(book_path):
+    positions = collect_positions(RULES, plies=6, games=40)
+    book = OpeningBook(book_path, RULES)
+    try:
+        assert len(book) == len(positions)
+        for _, gs in positions.values():
+            move = book.lookup(gs)
+            assert move in legal_actions(gs, RULES)
+            after = _after(gs, move)
+            for s in range(len(symmetries(RULES).perms)):
+                img = transform_state(gs, RULES, s)
+                assert _after(img, book.lookup(img)) == after    # the same reply up to symmetry
+        assert book.misses == 0
+    finally:
+        book.close()
+
+def test_lookup_misses_uncovered_position(book_path):
+    positions = collect_positions(RULES, plies=6, games=40)
+    _, gs = next(iter(positions.values()))
+    book = OpeningBook(book_path, RULES)
+    try:
+        gs.goats_placed += 10    # a placement count the book never saw
+        assert book_key(gs, RULES)[0] not in positions and book.lookup(gs) is None and book.misses == 1
+    finally:
+        book.close()
+
+def test_rejects_other_rules_and_truncated_files(book_path, tmp_path):
+    with pytest.raises(ValueError, match='different rules'):
+        OpeningBook(book_path, make_rules(7, enable_ko=False))
+    with open(book_path, 'rb') as f:
+        data = f.read()
+    for name, body in (('truncated', data[:-3]), ('short', data[:5]), ('empty', b'')):
+        path = str(tmp_path / name)
+        with open(path, 'wb') as f:
+            f.write(body)
+        with pytest.raises(ValueError):
+            OpeningBook(path, RULES)
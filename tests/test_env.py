@@ -0,0 +1,57 @@
+import numpy as np
+
+from core import (EMPTY, GOAT, TIGER, GameState, make_5x5_rules, initial_state, refresh_status, record_position,
+                  legal_actions, apply, terminal_status, action_to_index, index_to_action)
+from env import BatchBaghChalEnv
+
+WINNER = {'goat': GOAT, 'tiger': TIGER, 'draw': 3}
+
+def test_masks_and_winners_match_core(rules):
+    # Every game in the batch is mirrored by a core GameState playing the
+    # same sampled actions; masks, winners and states must agree each step.
+    B = 16
+    env = BatchBaghChalEnv(B, rules, seed=0)
+    env.reset()
+    states = [initial_state(rules) for _ in range(B)]
+    finished = 0
+    while finished < 100:
+        mask = env.legal_mask()
+        for r, gs in enumerate(states):
+            assert np.flatnonzero(mask[r]).tolist() == sorted(action_to_index(a, rules.N)
+                                                              for a in legal_actions(gs, rules))
+        acts = env.sample_legal()
+        _, _, done, info = env.step(acts)
+        for r, gs in enumerate(states):
+            assert apply(gs, rules, index_to_action(int(acts[r]), rules.N))
+            winner = terminal_status(gs, rules)[0]
+            if winner is None and not legal_actions(gs, rules):
+                winner = 'draw'
+            assert info['winner'][r] == WINNER.get(winner, 0)
+            assert done[r] == (winner is not None)
+            if done[r]:
+                states[r] = initial_state(rules)
+                finished += 1
+            else:
+                assert env.to_state(r) == gs
+
+def test_goat_without_moves_draws():
+    # 5x5 with the only empty square walled in by tigers: core reports no
+    # legal action but no result, the env draws that game and plays the rest.
+    rules = make_5x5_rules()
+    board = [GOAT]*25
+    board[0] = EMPTY
+    for t in (1, 5, 6, 24):
+        board[t] = TIGER
+    gs = refresh_status(GameState(board=board, goats_placed=20, goats_captured=0, player='goat', move_count=40),
+                        rules)
+    record_position(gs)
+    assert terminal_status(gs, rules)[0] is None and legal_actions(gs, rules) == []
+    env = BatchBaghChalEnv(4, rules, seed=0)
+    env.reset()
+    env.set_state(0, gs)
+    assert env.status().tolist() == [3, 0, 0, 0]
+    _, reward, done, info = env.step(env.sample_legal(), check=True)
+    assert done.tolist() == [True, False, False, False]
+    assert info['winner'][0] == 3 and reward[0] == 0.0
+    assert env.to_state(0) == initial_state(rules)
+    assert (env.move_count[1:] == 1).all()
@@ -0,0 +1,51 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from core import make_5x5_rules, initial_state
+from evaluator import FeatureEncoder, EvalService
+
+RULES = make_5x5_rules()
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_evaluate_batches_requests():
+    async def main():
+        model = lambda x: np.arange(len(x), dtype=np.float32)
+        async with EvalService(model, FeatureEncoder(RULES), max_batch=8) as service:
+            values = await asyncio.gather(*(service.evaluate(initial_state(RULES)) for _ in range(8)))
+        assert sorted(values) == list(range(8))
+        assert service.stats.batches == 1
+    run(main())
+
+def test_evaluate_before_start_raises():
+    async def main():
+        service = EvalService(lambda x: np.zeros(len(x)), FeatureEncoder(RULES))
+        with pytest.raises(RuntimeError):
+            await service.evaluate(initial_state(RULES))
+    run(main())
+
+def test_wrong_output_length_fails_batch():
+    async def main():
+        model = lambda x: np.zeros(len(x) - 1)
+        async with EvalService(model, FeatureEncoder(RULES), max_batch=4) as service:
+            results = await asyncio.gather(*(service.evaluate(initial_state(RULES)) for _ in range(4)),
+                                           return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+    run(main())
+
+def test_close_fails_pending_requests():
+    async def main():
+        service = EvalService(lambda x: np.zeros(len(x)), FeatureEncoder(RULES), max_batch=4, max_delay=60)
+        await service.start()
+        tasks = [asyncio.ensure_future(service.evaluate(initial_state(RULES))) for _ in range(6)]
+        await asyncio.sleep(0.01)    # four fill a batch and are answered; two wait on the long delay
+        await service.close()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        assert results[:4] == [0.0]*4
+        assert all(isinstance(r, RuntimeError) and str(r) == 'service closed' for r in results[4:])
+        with pytest.raises(RuntimeError):
+            await service.evaluate(initial_state(RULES))
+    run(main())
@@ -0,0 +1,78 @@
+import threading
+import time
+from dataclasses import replace
+
+from conftest import random_games
+from core import make_7x7_rules, make_rules, legal_actions, apply
+from mcts import MCTS
+from perft import build_position
+
+def _copy(gs):
+    return replace(gs, board=gs.board[:], seen_counts=dict(gs.seen_counts))
+
+def _visits(m):
+    return {a: (ch.N, ch.W) for a, ch in m.root.children.items()}
+
+def test_seeded_search_is_deterministic_and_legal(rules):
+    positions = 0
+    for gs, _ in random_games(rules, 2):
+        if positions == 20:
+            break
+        if not legal_actions(gs, rules):
+            continue
+        before = _copy(gs)
+        a, b = MCTS(rules, seed=7), MCTS(rules, seed=7)
+        move = a.choose(gs, iterations=40)
+        assert gs == before and gs.tiger_mobility == before.tiger_mobility
+        assert move in legal_actions(gs, rules)
+        assert b.choose(gs, iterations=40) == move and _visits(a) == _visits(b)
+        root = a.root
+        assert root.N == 40 == sum(ch.N for ch in root.children.values())
+        positions += 1
+    assert positions == 20
+
+def test_terminal_children_score_for_mover():
+    rules = make_rules(7, capture_to_win=3)
+    gs = build_position('chain', rules)    # two goats already captured, so any jump wins
+    m = MCTS(rules, seed=0)
+    m.choose(gs, iterations=300)
+    jumps = [ch for a, ch in m.root.children.items() if a[0] == 'jump']
+    assert len(jumps) == 2
+    assert all(ch.winner == 'tiger' and ch.mover == 'tiger' and ch.N > 0 and ch.W == ch.N for ch in jumps)
+    assert not jumps[0].children and not jumps[0].untried
+
+def test_chain_node_keeps_tiger_to_move():
+    rules = make_7x7_rules()
+    gs = build_position('chain', rules)
+    m = MCTS(rules, seed=0)
+    m.choose(gs, iterations=400)
+    chains = [ch for ch in m.root.children.values() if ch.player == 'tiger']
+    assert chains and all(ch.mover == 'tiger' and ch.action[0] == 'jump' for ch in chains)
+    for ch in chains:
+        assert all(a[0] == 'jump' and a[1] == ch.action[2] for a in ch.children)
+
+def test_tree_reuse():
+    rules = make_7x7_rules()
+    gs = build_position('initial', rules)
+    m = MCTS(rules, seed=0)
+    move = m.choose(gs, iterations=500)
+    apply(gs, rules, move)
+    reply = max(m.root.children[move].children.values(), key=lambda ch: ch.N).action
+    apply(gs, rules, reply)
+    m.choose(gs, iterations=100)
+    assert m.stats.reused > 0 and m.root.N == m.stats.reused + 100
+
+def test_parallel_workers():
+    rules = make_7x7_rules()
+    gs = build_position('initial', rules)
+    m = MCTS(rules, workers=2, seed=0)
+    try:
+        move = m.choose(gs, iterations=200)
+        assert move in legal_actions(gs, rules) and m.stats.iterations == 200
+        stop = threading.Event()
+        threading.Timer(0.3, stop.set).start()
+        t0 = time.perf_counter()
+        move = m.choose(gs, time_limit=60, stop=stop)
+        assert time.perf_counter() - t0 < 10 and move in legal_actions(gs, rules)
+    finally:
+        m.close()
@@ -0,0 +1,10 @@
+import pytest
+
+from perft import load_fixtures, run_perft
+
+FIXTURES = load_fixtures()
+
+@pytest.mark.parametrize('backend', ['core', 'compact'])
+@pytest.mark.parametrize('fx', FIXTURES, ids=lambda fx: f"{fx['position']}-{fx['option']}-d{fx['depth']}")
+def test_perft_matches_fixtures(fx, backend):
+    assert run_perft(fx['position'], fx['option'], fx['depth'], backend)[0] == fx['nodes']
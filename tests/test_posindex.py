@@ -0,0 +1,88 @@
+import pytest
+
+import posindex
+from conftest import random_games
+from core import make_5x5_rules, make_rules, initial_state, action_to_index, terminal_status
+from posindex import PositionIndex, build_index, merge_indexes, stats_key
+from records import RecordWriter
+
+RULES = make_5x5_rules()
+COLUMN = {'goat': 1, 'tiger': 2, 'draw': 3}
+
+def _write(path, games, seed):
+    # Writes seeded random games and returns their naive per-(key, action) counts.
+    counts = {}
+    moves = []
+    with RecordWriter(path, RULES, chunk_games=8) as w:
+        for gs, act in random_games(RULES, games, seed=seed):
+            if act is not None:
+                moves.append((stats_key(gs, RULES), action_to_index(act, RULES.N)))
+                continue
+            winner, reason = terminal_status(gs, RULES)
+            w.write([a for _, a in moves], winner, reason)
+            for ka in moves:
+                row = counts.setdefault(ka, [0, 0, 0, 0])
+                row[0] += 1
+                if winner in COLUMN:
+                    row[COLUMN[winner]] += 1
+            moves = []
+    return counts
+
+def _rows(path):
+    idx = PositionIndex(path, RULES)
+    try:
+        return {(k, a): c for k, a, c in zip(idx.keys.tolist(), idx.actions.tolist(), idx.counts.tolist())}
+    finally:
+        idx.close()
+
+def _add(*tables):
+    out = {}
+    for t in tables:
+        for ka, c in t.items():
+            out[ka] = [x + y for x, y in zip(out.get(ka, [0, 0, 0, 0]), c)]
+    return out
+
+@pytest.fixture(scope='module')
+def records(tmp_path_factory):
+    d = tmp_path_factory.mktemp('records')
+    paths = [str(d / 'a.rec'), str(d / 'b.rec')]
+    return paths, [_write(paths[0], 60, 1), _write(paths[1], 40, 2)]
+
+@pytest.mark.parametrize('workers,run_entries', [(1, 1 << 20), (1, 50), (2, 50)])
+def test_build_matches_naive_counts(records, tmp_path, monkeypatch, workers, run_entries):
+    monkeypatch.setattr(posindex, '_FAN_IN', 4)    # spilled runs then merge in several passes
+    paths, counts = records
+    out = str(tmp_path / 'games.pidx')
+    info = build_index(paths, out, workers=workers, run_entries=run_entries, chunks_per_job=2)
+    expected = _add(*counts)
+    assert info['games'] == 100 and info['rows'] == len(expected)
+    assert info['runs'] > (4 if run_entries == 50 else 1)
+    assert _rows(out) == expected
+
+def test_lookup_and_merge(records, tmp_path):
+    paths, counts = records
+    parts = [str(tmp_path / 'a.pidx'), str(tmp_path / 'b.pidx')]
+    for p, out in zip(paths, parts):
+        build_index([p], out)
+    merged = str(tmp_path / 'all.pidx')
+    assert merge_indexes(parts, merged) == len(_add(*counts))
+    assert _rows(merged) == _add(*counts)
+    idx = PositionIndex(merged, RULES)
+    try:
+        st = idx.lookup(initial_state(RULES))
+        assert (st.visits, st.goat_wins + st.tiger_wins + st.draws) == (100, 100)
+        assert sum(a.visits for a in st.actions) == 100
+        gs = initial_state(RULES)
+        gs.goats_placed = 7    # a placement count no game had with this board
+        assert idx.lookup(gs) is None
+    finally:
+        idx.close()
+
+def test_rejects_mixed_rules(records, tmp_path):
+    paths, _ = records
+    other = str(tmp_path / 'other.rec')
+    RecordWriter(other, make_rules(5, enable_ko=False)).close()
+    with pytest.raises(ValueError):
+        build_index([paths[0], other], str(tmp_path / 'x.pidx'))
+    with pytest.raises(ValueError):
+        PositionIndex(paths[0])
@@ -0,0 +1,85 @@
+import os
+
+import numpy as np
+import pytest
+
+from core import make_5x5_rules, make_rules, action_to_index
+from records import (WINNERS, REASONS, RecordWriter, encode_game, decode_games, read_header, read_records,
+                     chunk_offsets, read_chunks, to_numpy)
+from env import BatchBaghChalEnv
+
+def _games(rules, n):
+    # Distinct random games as (action indices, winner) from the batch env.
+    env = BatchBaghChalEnv(8, rules, seed=1)
+    env.reset()
+    moves = [[] for _ in range(8)]
+    games = []
+    while len(games) < n:
+        acts = env.sample_legal()
+        _, _, done, info = env.step(acts)
+        for r, a in enumerate(acts):
+            moves[r].append(a)    # NumPy integers, as env callers pass them
+            if done[r]:
+                games.append((moves[r], WINNERS[int(info['winner'][r]) - 1]))
+                moves[r] = []
+    return games[:n]
+
+def test_encode_decode_round_trip():
+    games = [([], None, None), ([0, 1, 127, 128, 16383, 16384], 'goat', 'blocked'), ([5]*300, 'draw', 'move_cap')]
+    games += [([i], w, r) for i, (w, r) in enumerate(zip(WINNERS, REASONS))]
+    payload = b''.join(encode_game(*g) for g in games)
+    out = list(decode_games(payload, len(games)))
+    assert [(r.actions, r.winner, r.reason) for r in out] == games
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_writer_round_trip(tmp_path, compress):
+    rules = make_5x5_rules()
+    games = _games(rules, 50)
+    path = str(tmp_path / 'games.rec')
+    with RecordWriter(path, rules, compress=compress, chunk_games=16) as w:
+        for moves, winner in games:
+            w.write(moves, winner)
+        w.write(np.asarray(games[0][0]), 'goat', 'capture')
+    assert read_header(path) == (rules, compress)
+    recs = list(read_records(path))
+    assert [(r.actions, r.winner) for r in recs[:-1]] == [([int(a) for a in m], w) for m, w in games]
+    assert (recs[-1].winner, recs[-1].reason) == ('goat', 'capture')
+    offsets = chunk_offsets(path)
+    assert [c for _, c in offsets] == [16, 16, 16, 3]
+    assert [r.actions for r in read_chunks(path, [offsets[1][0]])] == [r.actions for r in recs[16:32]]
+    arrays = to_numpy(path)
+    assert arrays['offsets'][-1] == len(arrays['actions']) == sum(len(r.actions) for r in recs)
+
+def test_tuple_actions_are_indexed(tmp_path):
+    rules = make_5x5_rules()
+    path = str(tmp_path / 'games.rec')
+    with RecordWriter(path, rules) as w:
+        w.write([('place', 12), ('move', 0, 1)], None)
+    assert next(read_records(path)).actions == [action_to_index(('place', 12), 5), action_to_index(('move', 0, 1), 5)]
+
+def test_append_trims_torn_chunk(tmp_path):
+    rules = make_5x5_rules()
+    games = _games(rules, 20)
+    path = str(tmp_path / 'games.rec')
+    with RecordWriter(path, rules, chunk_games=10) as w:
+        for moves, winner in games[:10]:
+            w.write(moves, winner)
+    size = os.path.getsize(path)
+    with open(path, 'ab') as f:
+        f.write(b'\x40\x00\x00\x00partial')    # a chunk header promising more than was written
+    assert len(list(read_records(path))) == 10
+    with RecordWriter(path, rules, chunk_games=10) as w:
+        assert os.path.getsize(path) == size
+        for moves, winner in games[10:]:
+            w.write(moves, winner)
+    assert [r.actions for r in read_records(path)] == [[int(a) for a in m] for m, _ in games]
+
+def test_header_mismatch(tmp_path):
+    path = str(tmp_path / 'games.rec')
+    RecordWriter(path, make_5x5_rules()).close()
+    with pytest.raises(ValueError):
+        RecordWriter(path, make_rules(5, enable_ko=False))
+    with open(path, 'r+b') as f:
+        f.write(b'XXXX')
+    with pytest.raises(ValueError):
+        read_header(path)
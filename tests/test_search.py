@@ -0,0 +1,69 @@
+import threading
+import time
+from dataclasses import replace
+
+from conftest import random_games
+from core import make_7x7_rules, make_5x5_rules, initial_state, legal_actions, apply
+from perft import build_position
+from search import AlphaBeta, MATE
+
+def _copy(gs):
+    return replace(gs, board=gs.board[:], seen_counts=dict(gs.seen_counts))
+
+def _choose(gs, rules, **kw):
+    before = _copy(gs)
+    ab = AlphaBeta(rules, tt_size=1 << 14)
+    move = ab.choose(gs, **kw)
+    assert gs == before and gs.tiger_mobility == before.tiger_mobility    # make/unmake left no trace
+    assert move in legal_actions(gs, rules)
+    return move, ab.stats
+
+def test_takes_capture():
+    rules = make_7x7_rules()
+    gs = build_position('chain', rules)
+    move, st = _choose(gs, rules, max_depth=3)
+    assert move[0] == 'jump' and not st.timed_out
+
+def test_continues_chain():
+    rules = make_7x7_rules()
+    gs = build_position('chain', rules)
+    for a in legal_actions(gs, rules):
+        probe = _copy(gs)
+        apply(probe, rules, a)
+        if probe.chain_active:
+            break
+    assert probe.chain_active
+    move, _ = _choose(probe, rules, max_depth=3)
+    assert move[0] == 'jump' and move[1] == probe.chain_src
+
+def test_honours_time_limit():
+    rules = make_7x7_rules()
+    gs = initial_state(rules)
+    t0 = time.perf_counter()
+    _, st = _choose(gs, rules, time_limit=0.2, max_depth=64)
+    assert st.timed_out and time.perf_counter() - t0 < 1.0
+
+def test_honours_stop():
+    rules = make_7x7_rules()
+    stop = threading.Event()
+    stop.set()
+    t0 = time.perf_counter()
+    _, st = _choose(initial_state(rules), rules, time_limit=60, max_depth=64, stop=stop)
+    assert st.timed_out and time.perf_counter() - t0 < 1.0
+
+def test_mate_scores_survive_reuse():
+    # An engine reused along a game reads transposition entries stored at
+    # other plies; its mate distances must equal a fresh engine's.
+    rules = make_5x5_rules()
+    shared = AlphaBeta(rules, tt_size=1 << 16)
+    mates = 0
+    for gs, _ in random_games(rules, 6, seed=0):
+        if len(legal_actions(gs, rules)) < 2:
+            continue
+        shared.choose(gs, time_limit=60, max_depth=4)
+        fresh = AlphaBeta(rules, tt_size=1 << 16)
+        fresh.choose(gs, time_limit=60, max_depth=4)
+        if abs(fresh.stats.score) >= MATE:
+            mates += 1
+            assert shared.stats.score == fresh.stats.score
+    assert mates > 5
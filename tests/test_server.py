@@ -0,0 +1,64 @@
+import asyncio
+import json
+
+import pytest
+
+from server import AnalysisServer, BadRequest, rules_from, analyze, state_from, _engines, _MAX_ENGINES
+
+def test_rules_from_whitelist():
+    assert rules_from({}).options() == (7, 30, 8, True, True, True)
+    assert rules_from({'N': 5, 'goats_to_place': 20, 'capture_to_win': 5}).options()[:3] == (5, 20, 5)
+    for spec in ({'N': 1001}, {'N': 6}, {'N': 7.0}, {'N': True}, {'goats_to_place': 10**6}, {'goats_to_place': 0},
+                 {'capture_to_win': 31}, {'enable_ko': 1}, {'sanctuaries': 'yes'}, {'size': 7}, []):
+        with pytest.raises(BadRequest):
+            rules_from(spec)
+
+def test_state_from_rejects_impossible_counts():
+    rules = rules_from({'N': 5, 'goats_to_place': 20, 'capture_to_win': 5})
+    board = 'TG..T' + '.G...'*3 + 'T...T'    # four goats on the board
+    gs = state_from({'board': board, 'goats_placed': 6, 'goats_captured': 2}, rules)
+    assert (gs.goats_placed, gs.goats_captured) == (6, 2) and gs.tiger_mobility is not None
+    for extra in ({'goats_placed': 6}, {'goats_placed': 10**9, 'goats_captured': 2},
+                  {'goats_placed': 6, 'goats_captured': -2}, {'goats_placed': 4, 'goats_captured': 6},
+                  {'goats_placed': '6', 'goats_captured': 2},
+                  {'goats_placed': 6, 'goats_captured': 2, 'move_count': -1},
+                  {'goats_placed': 6, 'goats_captured': 2, 'player': 'tiger', 'chain_src': 4}):
+        with pytest.raises(BadRequest):
+            state_from({'board': board, **extra}, rules)
+    with pytest.raises(BadRequest):
+        state_from({'board': 'T' + board[1:4] + '.' + board[5:], 'goats_placed': 6, 'goats_captured': 2}, rules)
+
+def test_engines_are_bounded():
+    rule_sets = [rules_from({'goats_to_place': g}) for g in range(10, 10 + 2*_MAX_ENGINES)]
+    for rules in rule_sets:
+        body, complete = analyze(state_from({'actions': []}, rules), rules, 'search', 1, 5.0)
+        assert complete and json.loads(body)['move'] is not None
+    assert len(_engines) == _MAX_ENGINES
+
+def test_timed_out_search_is_not_cached():
+    rules = rules_from({})
+    gs = state_from({'actions': [24]}, rules)
+    body, complete = analyze(gs, rules, 'search', 30, 0.01)
+    assert not complete and json.loads(body)['depth'] < 30
+
+async def _raw(port: int, request: bytes) -> bytes:
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(request)
+    await writer.drain()
+    out = await reader.read()    # the server answers, then closes the connection
+    writer.close()
+    return out
+
+def test_bad_headers_are_400():
+    async def main():
+        server = AnalysisServer(1)
+        await server.start(port=0)
+        try:
+            for n in (b'abc', b'-5'):
+                out = await _raw(server.port, b'POST /analyze HTTP/1.1\r\nContent-Length: %s\r\n\r\n{}' % n)
+                assert out.startswith(b'HTTP/1.1 400 ')
+            out = await _raw(server.port, b'GET /stats HTTP/1.1\r\n' + b'X-Pad: 1\r\n'*1000 + b'\r\n')
+            assert out.startswith(b'HTTP/1.1 400 ') and b'too many headers' in out
+        finally:
+            await server.close()
+    asyncio.run(main())
@@ -0,0 +1,40 @@
+from collections import Counter
+
+from conftest import random_games
+from core import (MAX_PLIES, legal_actions, apply_undo, undo, terminal_status, any_legal_move, count_tiger_mobility,
+                  goat_greedy)
+
+def ref_status(gs, rules):
+    # The status as it was computed before tiger mobility was cached: a full
+    # scan of the tiger's legal actions.
+    if rules.enable_ko and gs.seen_counts.get(gs.zkey, 0) >= 3:
+        return 'draw', 'ko'
+    if gs.goats_captured >= rules.capture_to_win:
+        return 'tiger', 'capture'
+    if gs.player == 'tiger' and not legal_actions(gs, rules, 'tiger'):
+        return 'goat', 'blocked'
+    if gs.move_count >= MAX_PLIES:
+        return 'draw', 'move_cap'
+    return None, None
+
+def _goat_greedy(gs, rules):
+    return goat_greedy(gs, rules) if gs.player == 'goat' else None
+
+def test_cached_status_matches_scan(rules):
+    # Seeded games where the goats almost always play greedy, so tigers get
+    # blocked as well as capturing; every step is also undone to check the
+    # restored count.
+    reasons = Counter()
+    for gs, act in random_games(rules, 40, _goat_greedy, 0.95):
+        assert gs.tiger_mobility == count_tiger_mobility(gs.board, rules)
+        status = terminal_status(gs, rules)
+        assert status == ref_status(gs, rules)
+        for role in ('goat', 'tiger'):
+            assert any_legal_move(gs, rules, role) == bool(legal_actions(gs, rules, role))
+        if act is None:
+            reasons[status[1]] += 1
+            continue
+        before = (gs.board[:], gs.tiger_mobility, dict(gs.seen_counts))
+        undo(gs, rules, apply_undo(gs, rules, act))
+        assert (gs.board, gs.tiger_mobility, gs.seen_counts) == before
+    assert reasons['blocked'] and reasons['capture']
@@ -0,0 +1,22 @@
+from conftest import random_games
+from core import legal_actions
+from symmetry import symmetries, canonical_key, canonical_state, transform_state, to_canonical, from_canonical
+
+def test_canonical_key_is_invariant(rules):
+    # Every symmetric image of a position has the same canonical key, and
+    # actions map to legal actions of the image and back.
+    sy = symmetries(rules)
+    assert len(sy.perms) > 1 and sy.perms[0] == tuple(range(rules.N*rules.N))
+    positions = 0
+    for gs, _ in random_games(rules, 5):
+        key = canonical_key(gs, rules)[0]
+        acts = legal_actions(gs, rules)
+        for s in range(len(sy.perms)):
+            img = transform_state(gs, rules, s)
+            assert canonical_key(img, rules)[0] == key
+            assert sorted(legal_actions(img, rules)) == sorted(to_canonical(a, rules, s) for a in acts)
+            assert [from_canonical(to_canonical(a, rules, s), rules, s) for a in acts] == acts
+        cs, _ = canonical_state(gs, rules)
+        assert canonical_key(cs, rules) == (key, 0)
+        positions += 1
+    assert positions > 100
@@ -0,0 +1,112 @@
+from collections import deque
+from itertools import combinations
+
+import pytest
+
+from core import EMPTY, GOAT, TIGER, GameState, make_rules, legal_actions, apply_undo, undo
+from tablebase import TIGERS, Tablebase, generate
+
+def _key(gs):
+    return tuple(gs.board), gs.player, gs.chain_src if gs.chain_active else None, gs.goats_captured
+
+def _state(key, rules):
+    board, player, chain, captured = key
+    return GameState(board=list(board), goats_placed=rules.goats_to_place, goats_captured=captured, player=player,
+                     move_count=0, chain_active=chain is not None, chain_src=chain)
+
+def exact_solve(rules, min_captured):
+    # Independent reference: plain retrograde BFS over the explicit move graph.
+    # Positions are settled in order of distance, so a win takes its shortest
+    # line and a loss (settled when its last reply resolves) its longest.
+    NN = rules.N*rules.N
+    todo = []
+    for c in range(min_captured, rules.capture_to_win):
+        goats = rules.goats_to_place - c
+        for tig in combinations(range(NN), TIGERS):
+            free = [sq for sq in range(NN) if sq not in tig]
+            for gsq in combinations(free, goats):
+                board = [EMPTY]*NN
+                for sq in tig:
+                    board[sq] = TIGER
+                for sq in gsq:
+                    board[sq] = GOAT
+                for player in ('goat', 'tiger'):
+                    todo.append((tuple(board), player, None, c))
+    children, parents, seeds = {}, {}, []
+    while todo:
+        key = todo.pop()
+        if key in children:
+            continue
+        gs = _state(key, rules)
+        kids, wins_now = [], False
+        for a in legal_actions(gs, rules):
+            rec = apply_undo(gs, rules, a)
+            if gs.goats_captured >= rules.capture_to_win:
+                wins_now = True
+            else:
+                k = _key(gs)
+                kids.append(k)
+                parents.setdefault(k, []).append(key)
+                todo.append(k)
+            undo(gs, rules, rec)
+        children[key] = kids
+        if wins_now:
+            seeds.append((key, 'win', 1))
+        elif not kids and key[1] == 'tiger':
+            seeds.append((key, 'loss', 0))
+    result = {}
+    left = {k: len(v) for k, v in children.items()}
+    queue = deque()
+    for key, res, d in sorted(seeds, key=lambda s: s[2]):
+        result[key] = (res, d)
+        queue.append(key)
+    while queue:
+        key = queue.popleft()
+        res, d = result[key]
+        for p in parents.get(key, ()):
+            if p in result:
+                continue
+            same = p[1] == key[1]
+            if (res == 'loss') != same:     # this reply wins for p's mover
+                result[p] = ('win', d + 1)
+                queue.append(p)
+            else:
+                left[p] -= 1
+                if left[p] == 0:
+                    result[p] = ('loss', d + 1)
+                    queue.append(p)
+    return {k: result.get(k, ('draw', 0)) for k in children}
+
+@pytest.mark.parametrize('options', [
+    dict(N=3, goats_to_place=3, capture_to_win=2),
+    dict(N=3, goats_to_place=3, capture_to_win=2, enable_multijump=False, sanctuaries=False),
+    dict(N=3, goats_to_place=4, capture_to_win=2, sanctuaries=False),
+])
+def test_matches_exact_solver(tmp_path, options):
+    rules = make_rules(**options)
+    path = str(tmp_path / 'tb')
+    generate(rules, path, 0)
+    tb = Tablebase(path, rules)
+    exact = exact_solve(rules, 0)
+    wrong = [(k, tb.probe(_state(k, rules)), v) for k, v in exact.items() if tb.probe(_state(k, rules)) != v]
+    tb.close()
+    assert not wrong, f"{len(wrong)} of {len(exact)} differ, e.g. {wrong[:3]}"
+
+def test_best_action_wins_fastest(tmp_path):
+    rules = make_rules(3, goats_to_place=3, capture_to_win=2)
+    path = str(tmp_path / 'tb')
+    generate(rules, path, 0)
+    tb = Tablebase(path, rules)
+    exact = exact_solve(rules, 0)
+    for key, (res, d) in exact.items():
+        if res != 'win':
+            continue
+        gs = _state(key, rules)
+        rec = apply_undo(gs, rules, tb.best_action(gs))
+        if gs.goats_captured < rules.capture_to_win:
+            after = exact[_key(gs)]
+            assert after == (('win' if gs.player == key[1] else 'loss'), d - 1)
+        else:
+            assert d == 1
+        undo(gs, rules, rec)
+    tb.close()
@@ -0,0 +1,245 @@
+import argparse
+import json
+import math
+import multiprocessing as mp
+import os
+import random
+import sys
+import time
+from collections import Counter
+from queue import Empty
+from typing import Dict, List, Optional
+
+from core import (Rules, make_rules, initial_state, legal_actions, apply, terminal_status, tiger_greedy, goat_greedy,
+                  action_to_index)
+from search import AlphaBeta
+from book import OpeningBook
+from records import RecordWriter
+
+POLICIES = ('greedy', 'random', 'search')
+_books: Dict[str, OpeningBook] = {}
+
+def rules_for(config: Dict) -> Rules:
+    return make_rules(7, goats_to_place=config['goats_to_place'], capture_to_win=config['capture_to_win'],
+                      enable_multijump=config['enable_multijump'], enable_ko=config['enable_ko'])
+
+def make_policy(spec: str, role: str, rules: Rules):
+    name, _, arg = spec.partition(':')
+    if name == 'greedy':
+        greedy = tiger_greedy if role == 'tiger' else goat_greedy
+        return lambda gs, rng: greedy(gs, rules)
+    if name == 'random':
+        return lambda gs, rng: rng.choice(legal_actions(gs, rules) or [None])
+    if name == 'search':
+        engine = AlphaBeta(rules, tt_size=1 << 16)
+        depth = int(arg or 2)
+        return lambda gs, rng: engine.choose(gs, time_limit=float('inf'), max_depth=depth)
+    raise ValueError(f"unknown policy {spec!r}; expected one of {POLICIES}")
+
+def play_game(game_id: int, config: Dict) -> Dict:
+    rules = rules_for(config)
+    seed = config['seed'] + game_id
+    rng = random.Random(seed)
+    policies = {role: make_policy(config[role], role, rules) for role in ('goat', 'tiger')}
+    eps = config['epsilon']
+    book = None
+    if config.get('book'):
+        # One mapping per worker process; the pages themselves are shared by the OS.
+        book = _books.get(config['book'])
+        if book is None:
+            book = _books[config['book']] = OpeningBook(config['book'], rules)
+    gs = initial_state(rules)
+    moves = [] if config.get('records') else None
+    t0 = time.perf_counter()
+    while True:
+        winner, reason = terminal_status(gs, rules)
+        if winner is not None:
+            break
+        if eps and rng.random() < eps:
+            acts = legal_actions(gs, rules)
+            act = rng.choice(acts) if acts else None
+        else:
+            act = None
+            if book is not None and gs.goats_placed < rules.goats_to_place:
+                act = book.lookup(gs)
+            if act is None:
+                act = policies[gs.player](gs, rng)
+        if act is None or not apply(gs, rules, act):
+            winner, reason = 'draw', 'no_move'
+            break
+        if moves is not None:
+            moves.append(action_to_index(act, rules.N))
+    rec = {'game': game_id, 'seed': seed, 'winner': winner, 'reason': reason, 'plies': gs.move_count,
+           'captures': gs.goats_captured, 'seconds': round(time.perf_counter() - t0, 4)}
+    if moves is not None:
+        rec['actions'] = moves
+    return rec
+
+def seed_blocks(games: int, workers: int) -> List[range]:
+    # Worker w always owns the same contiguous block of game ids.
+    return [range(games*w // workers, games*(w+1) // workers) for w in range(workers)]
+
+def _worker(config: Dict, ids: List[int], queue):
+    for i in ids:
+        queue.put(play_game(i, config))
+    queue.put(None)
+
+def load_results(path: str):
+    config, results = None, {}
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                break  # torn last line of an interrupted run
+            if 'config' in rec:
+                config = rec['config']
+            else:
+                results[rec['game']] = rec
+    return config, results
+
+def _without_games(config: Dict) -> Dict:
+    return {k: v for k, v in config.items() if k != 'games'}
+
+def _trim_partial_line(path: str):
+    with open(path, 'rb+') as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+def wilson(k: int, n: int, z: float = 1.96):
+    if n == 0:
+        return 0.0, 0.0, 0.0
+    p = k / n
+    den = 1 + z*z/n
+    mid = (p + z*z/(2*n)) / den
+    half = z*math.sqrt(p*(1-p)/n + z*z/(4*n*n)) / den
+    return p, max(0.0, mid - half), min(1.0, mid + half)
+
+def summarize(results) -> str:
+    results = list(results)
+    n = len(results)
+    wins = Counter(r['winner'] for r in results)
+    reasons = Counter(r['reason'] for r in results)
+    lines = [f"games: {n}"]
+    for who in ('tiger', 'goat', 'draw'):
+        p, lo, hi = wilson(wins[who], n)
+        lines.append(f"{who:>6}: {wins[who]:6d}  {100*p:5.1f}%  95% CI [{100*lo:5.1f}%, {100*hi:5.1f}%]")
+    if n:
+        lines.append(f"mean plies: {sum(r['plies'] for r in results)/n:.1f}   "
+                     f"mean captures: {sum(r['captures'] for r in results)/n:.2f}")
+    lines.append("reasons: " + ", ".join(f"{k}={v}" for k, v in sorted(reasons.items())))
+    return "\n".join(lines)
+
+def run(config: Dict, out: str, workers: int, resume: bool) -> Dict[int, Dict]:
+    done: Dict[int, Dict] = {}
+    old_config = None
+    if os.path.exists(out):
+        if not resume:
+            raise SystemExit(f"{out} exists; pass --resume to continue it")
+        _trim_partial_line(out)
+        old_config, done = load_results(out)
+        if old_config is not None and _without_games(old_config) != _without_games(config):
+            raise SystemExit(f"{out} was written with a different configuration: {old_config}")
+    blocks = [[i for i in block if i not in done] for block in seed_blocks(config['games'], workers)]
+    blocks = [b for b in blocks if b]
+    records = RecordWriter(config['records'], rules_for(config)) if config.get('records') else None
+    batch = records.chunk_games if records is not None else 1
+    pending: List[str] = []
+    try:
+        with open(out, 'a') as f:
+            def commit():
+                # Result lines go out only after their games reach the record
+                # file, so --resume never skips a game the records lack.
+                if records is not None:
+                    records.flush()
+                f.writelines(pending)
+                f.flush()
+                pending.clear()
+
+            if old_config is None:
+                f.write(json.dumps({'config': config}) + "\n")
+            if not blocks:
+                return done
+            try:
+                _play(config, blocks, done, records, pending, batch, commit)
+            finally:
+                commit()
+    finally:
+        if records is not None:
+            records.close()
+    return done
+
+def _play(config: Dict, blocks, done: Dict[int, Dict], records: Optional[RecordWriter], pending: List[str],
+          batch: int, commit):
+    queue = mp.Queue()
+    procs = [mp.Process(target=_worker, args=(config, b, queue), daemon=True) for b in blocks]
+    for p in procs:
+        p.start()
+    running = len(procs)
+    t0 = time.perf_counter()
+    while running:
+        try:
+            rec = queue.get(timeout=5.0)
+        except Empty:
+            if not any(p.is_alive() for p in procs):
+                raise SystemExit("tournament workers exited early; rerun with --resume")
+            continue
+        if rec is None:
+            running -= 1
+            continue
+        actions = rec.pop('actions', None)
+        if records is not None:
+            records.write(actions, rec['winner'], rec['reason'])
+        done[rec['game']] = rec
+        pending.append(json.dumps(rec) + "\n")
+        if len(pending) >= batch:
+            commit()
+    for p in procs:
+        p.join()
+    rate = sum(len(b) for b in blocks) / (time.perf_counter() - t0)
+    print(f"played {sum(len(b) for b in blocks)} games with {len(procs)} workers ({rate:.1f} games/s)",
+          file=sys.stderr)
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Self-play tournament runner for 7x7 Bagh-Chal.")
+    ap.add_argument('--games', type=int, default=100)
+    ap.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    ap.add_argument('--seed', type=int, default=0, help="game i is played with seed SEED+i")
+    ap.add_argument('--goat', default='greedy', help="greedy | random | search[:depth]")
+    ap.add_argument('--tiger', default='greedy', help="greedy | random | search[:depth]")
+    ap.add_argument('--epsilon', type=float, default=0.1, help="probability of a random move each ply")
+    ap.add_argument('--goats-to-place', type=int, default=30)
+    ap.add_argument('--capture-to-win', type=int, default=8)
+    ap.add_argument('--no-multijump', action='store_true')
+    ap.add_argument('--no-ko', action='store_true')
+    ap.add_argument('--book', help="opening book built by book.py, consulted during placement")
+    ap.add_argument('--out', default='tournament.jsonl')
+    ap.add_argument('--records', help="also append every game's moves to this binary record file")
+    ap.add_argument('--resume', action='store_true', help="skip games already present in --out")
+    ap.add_argument('--summary', action='store_true', help="only summarize an existing --out file")
+    args = ap.parse_args(argv)
+
+    if args.summary:
+        _, results = load_results(args.out)
+        print(summarize(results.values()))
+        return
+    config = {
+        'games': args.games, 'seed': args.seed, 'goat': args.goat, 'tiger': args.tiger, 'epsilon': args.epsilon,
+        'goats_to_place': args.goats_to_place, 'capture_to_win': args.capture_to_win,
+        'enable_multijump': not args.no_multijump, 'enable_ko': not args.no_ko,
+    }
+    if args.book:
+        config['book'] = args.book
+    if args.records:
+        config['records'] = args.records
+    for role in ('goat', 'tiger'):
+        make_policy(config[role], role, rules_for(config))
+    results = run(config, args.out, max(1, args.workers), args.resume)
+    print(summarize(results.values()))
+
+if __name__ == '__main__':
+    main()